@@ -1,16 +1,29 @@
 import time
 import os
+import asyncio
+import hashlib
+import json
 import logging
-from datetime import date, timedelta
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from datetime import date, datetime, timedelta, timezone
 from fastapi import FastAPI, Query, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Callable
 import random
-import pickle
 import pandas as pd
 
+from model_registry import ModelRegistry, make_predict_validator
+from streaming import Broadcaster, format_sse
+from src.weather_prediction.online_forecaster import OnlineWeatherForecaster
+from src.anomaly_detection import DEFAULT_FEEDS, INVALID_FLAGS, SensorMonitor
+from src.energy_aggregation import EnergyAggregator
+
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -51,6 +64,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Nén response lớn hơn ngưỡng; bỏ qua SSE vì gzip sẽ giữ lại event trong buffer
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1000"))
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/api/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
 # Models
 class WeatherData(BaseModel):
     date: str
@@ -75,12 +100,30 @@ class ComfortDataFromAPI(BaseModel):
     light: Optional[float]
     comfortScore: Optional[float]
 
+# Telemetry ingest model
+class TelemetryReading(BaseModel):
+    timestamp: Optional[datetime] = None
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    pressure: Optional[float] = None
+    windSpeed: Optional[float] = None
+    light: Optional[float] = None
+
+# Energy ingest model: kWh consumed since the device's previous reading
+class EnergyReading(BaseModel):
+    device: str
+    value: float
+    timestamp: Optional[datetime] = None
+
+# Longest forecast served; `days` on every forecast endpoint is bounded by it
+FORECAST_HORIZON_DAYS = 14
+
 # Request bundling model
 class BundledRequest(BaseModel):
     weather_forecast: Optional[bool] = False
     comfort_forecast: Optional[bool] = False
     current_weather: Optional[bool] = False
-    days: Optional[int] = 7
+    days: int = Field(7, ge=1, le=FORECAST_HORIZON_DAYS)
 
 class BundledResponse(BaseModel):
     weather_forecast: Optional[List[ForecastWeatherData]] = None
@@ -89,22 +132,40 @@ class BundledResponse(BaseModel):
 
 # Cache implementation
 class APICache:
+    # Model hot reload invalidates entries from the registry watcher thread,
+    # so every access goes through the lock
     def __init__(self, ttl: int = 300):  # Default TTL: 5 minutes
         self.cache: Dict[str, Dict[str, Any]] = {}
         self.ttl = ttl
+        self.lock = threading.Lock()
     
     def get(self, key: str) -> Any:
-        if key in self.cache:
-            item = self.cache[key]
-            if time.time() < item["expiry"]:
-                return item["data"]
-            else:
-                del self.cache[key]
-        return None
+        entry = self.get_entry(key)
+        return entry["data"] if entry is not None else None
     
     def set(self, key: str, data: Any, ttl: Optional[int] = None) -> None:
-        expiry = time.time() + (ttl if ttl is not None else self.ttl)
-        self.cache[key] = {"data": data, "expiry": expiry}
+        now = time.time()
+        expiry = now + (ttl if ttl is not None else self.ttl)
+        with self.lock:
+            self.cache[key] = {"data": data, "expiry": expiry, "created": now}
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        # Entry with its metadata (data, expiry, created), None if missing/expired
+        with self.lock:
+            item = self.cache.get(key)
+            if item is None:
+                return None
+            if time.time() >= item["expiry"]:
+                self.cache.pop(key, None)
+                return None
+            return item
+
+    def invalidate(self, prefix: str) -> int:
+        with self.lock:
+            keys = [k for k in self.cache if k.startswith(prefix)]
+            for k in keys:
+                del self.cache[k]
+        return len(keys)
 
 # Initialize cache
 cache = APICache(ttl=300)  # 5 minutes cache for most data
@@ -113,31 +174,40 @@ current_weather_cache = APICache(ttl=60)  # 1 minute cache for current weather
 # Load model
 WEATHER_MODEL_PATH = './model/weather_model.pkl'
 COMFORT_MODEL_PATH = './model/comfort_model.pkl'
-weather_model = None
-comfort_model = None
+MODEL_POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "5"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
-def load_models():
-    global weather_model, comfort_model
-    try:
-        if os.path.exists(WEATHER_MODEL_PATH):
-            with open(WEATHER_MODEL_PATH, 'rb') as f:
-                weather_model = pickle.load(f)
-            logger.info(f"Loaded weather model from {WEATHER_MODEL_PATH}")
-        else:
-            logger.warning(f"Weather model not found at {WEATHER_MODEL_PATH}")
+model_registry = ModelRegistry(poll_interval=MODEL_POLL_INTERVAL)
+model_registry.register(
+    "weather", WEATHER_MODEL_PATH,
+    make_predict_validator(['Humidity', 'Pressure', 'Wind Speed'], [50.0, 1010.0, 10.0])
+)
+model_registry.register(
+    "comfort", COMFORT_MODEL_PATH,
+    make_predict_validator(['Temperature', 'Humidity', 'Light'], [23.0, 50.0, 60.0])
+)
 
-        if os.path.exists(COMFORT_MODEL_PATH):
-            with open(COMFORT_MODEL_PATH, 'rb') as f:
-                comfort_model = pickle.load(f)
-            logger.info(f"Loaded comfort model from {COMFORT_MODEL_PATH}")
-        else:
-            logger.warning(f"Comfort model not found at {COMFORT_MODEL_PATH}")
+# Cache entries computed from each model, dropped when that model changes
+# (the versioned keys already keep them from being served; this frees them)
+MODEL_CACHE_DEPENDENCIES = {
+    "weather": [(cache, "weather_forecast")],
+    "comfort": [(current_weather_cache, "current_weather"), (cache, "comfort_forecast")],
+}
 
-    except Exception as e:
-        logger.error(f"Error loading models: {e}")
+def invalidate_model_dependents(name: str, entry) -> None:
+    for dependent_cache, prefix in MODEL_CACHE_DEPENDENCIES.get(name, []):
+        dropped = dependent_cache.invalidate(prefix)
+        if dropped:
+            logger.info(f"Invalidated {dropped} cache entries for '{prefix}' after {name} model -> {entry.version}")
+
+model_registry.on_change(invalidate_model_dependents)
+
+def load_models():
+    model_registry.reload()
 
 # Predict comfort score
 def predict_comfort_score_from_model(temperature: float, humidity: float, light: float) -> Optional[float]:
+    comfort_model = model_registry.get("comfort")
     if comfort_model:
         try:
             df = pd.DataFrame([[temperature, humidity, light]], columns=['Temperature', 'Humidity', 'Light'])
@@ -185,8 +255,33 @@ def generate_current_weather() -> WeatherData:
     
     return current_data
 
+# Online forecaster, updated O(1) per telemetry reading
+FORECASTER_STATE_PATH = './model/online_forecaster.json'
+TELEMETRY_HISTORY_PATH = './logs/prediction.csv'
+FORECASTER_SAVE_EVERY = 100  # readings between state checkpoints
+MAX_CLOCK_SKEW_SECONDS = 300  # client timestamps later than now + this are rejected
+
+forecaster = OnlineWeatherForecaster()
+
+def load_forecaster():
+    global forecaster
+    try:
+        if os.path.exists(FORECASTER_STATE_PATH):
+            forecaster = OnlineWeatherForecaster.load(FORECASTER_STATE_PATH)
+            logger.info(f"Loaded forecaster state ({forecaster.observations} observations)")
+        elif os.path.exists(TELEMETRY_HISTORY_PATH):
+            rows = forecaster.bootstrap_from_csv(TELEMETRY_HISTORY_PATH)
+            forecaster.save(FORECASTER_STATE_PATH)
+            logger.info(f"Bootstrapped forecaster from {rows} rows of {TELEMETRY_HISTORY_PATH}")
+    except Exception as e:
+        logger.error(f"Error loading forecaster: {e}")
+
 # Helper to generate weather forecast
 def generate_weather_forecast(days: int) -> List[ForecastWeatherData]:
+    if forecaster.ready:
+        return [ForecastWeatherData(**day) for day in forecaster.forecast(days)]
+
+    # Chưa đủ dữ liệu telemetry gần đây: giá trị ngẫu nhiên như trước
     today = date.today()
     forecast_list = [
         ForecastWeatherData(
@@ -222,74 +317,108 @@ def generate_comfort_forecast(days: int) -> List[ComfortDataFromAPI]:
     
     return forecast_list
 
-# API: Current weather
-@app.get("/api/weather/current", response_model=WeatherData)
-@limiter.limit("10/minute")  # Increased limit for individual endpoints
-async def get_current_weather(request: Request):
-    logger.info("API: Current weather requested.")
-    
-    # Check cache first
-    cache_key = "current_weather"
+# Full forecast horizon, computed once per cache refresh and shared by every
+# `days` value and by both the individual and bundled endpoints
+
+# Cache keys carry the version of the model that produced the entry: a horizon
+# computed while a model is being swapped is stored under the old version's key
+# and can never be read once the new version is serving
+def weather_horizon_key() -> str:
+    return get_cache_key("weather_forecast", horizon=FORECAST_HORIZON_DAYS, model=model_registry.version("weather"))
+
+def comfort_horizon_key() -> str:
+    return get_cache_key("comfort_forecast", horizon=FORECAST_HORIZON_DAYS, model=model_registry.version("comfort"))
+
+def current_weather_key() -> str:
+    return get_cache_key("current_weather", model=model_registry.version("comfort"))
+
+def get_weather_forecast_horizon(cache_key: Optional[str] = None) -> List[ForecastWeatherData]:
+    cache_key = cache_key or weather_horizon_key()
+    horizon = cache.get(cache_key)
+    if horizon is None:
+        horizon = generate_weather_forecast(FORECAST_HORIZON_DAYS)
+        cache.set(cache_key, horizon)
+        logger.info(f"Computed weather forecast horizon ({FORECAST_HORIZON_DAYS} days)")
+    return horizon
+
+def get_comfort_forecast_horizon(cache_key: Optional[str] = None) -> List[ComfortDataFromAPI]:
+    cache_key = cache_key or comfort_horizon_key()
+    horizon = cache.get(cache_key)
+    if horizon is None:
+        horizon = generate_comfort_forecast(FORECAST_HORIZON_DAYS)
+        cache.set(cache_key, horizon)
+        logger.info(f"Computed comfort forecast horizon ({FORECAST_HORIZON_DAYS} days)")
+    return horizon
+
+# Current weather through its 1-minute cache, shared by the endpoints and the stream
+def get_current_weather_data(cache_key: Optional[str] = None) -> WeatherData:
+    cache_key = cache_key or current_weather_key()
     cached_data = current_weather_cache.get(cache_key)
-    
     if cached_data:
-        logger.info("API: Returning cached current weather.")
         return cached_data
-    
-    # Generate new data
+
     current_data = generate_current_weather()
-    
-    # Cache the result
     current_weather_cache.set(cache_key, current_data)
-    
-    logger.info(f"API: Returning fresh current weather")
     return current_data
 
+# HTTP caching aligned with APICache: max-age = remaining TTL of the cache entry,
+# ETag = hash of the body, Last-Modified = when the entry was computed
+def cached_json_response(request: Request, data: Any, api_cache: APICache, cache_key: str) -> Response:
+    body = json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+    # Weak ETag: same representation whether or not gzip is applied afterwards
+    etag = 'W/"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+    entry = api_cache.get_entry(cache_key)
+    now = time.time()
+    expiry = entry["expiry"] if entry else now
+    created = entry["created"] if entry else now
+    headers = {
+        "Cache-Control": f"public, max-age={max(0, int(expiry - now))}",
+        "ETag": etag,
+        "Last-Modified": formatdate(created, usegmt=True),
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag.removeprefix("W/") in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+            if int(created) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# API: Current weather
+@app.get("/api/weather/current", response_model=WeatherData)
+@limiter.limit("10/minute")  # Increased limit for individual endpoints
+async def get_current_weather(request: Request):
+    logger.info("API: Current weather requested.")
+    cache_key = current_weather_key()
+    data = get_current_weather_data(cache_key)
+    return cached_json_response(request, data, current_weather_cache, cache_key)
+
 # API: Forecast weather
 @app.get("/api/weather/forecast", response_model=List[ForecastWeatherData])
 @limiter.limit("10/minute")  # Increased limit for individual endpoints
-async def get_weather_forecast(request: Request, days: int = Query(7, ge=1, le=14)):
+async def get_weather_forecast(request: Request, days: int = Query(7, ge=1, le=FORECAST_HORIZON_DAYS)):
     logger.info(f"API: Forecast weather for {days} days requested.")
-    
-    # Check cache first
-    cache_key = get_cache_key("weather_forecast", days=days)
-    cached_data = cache.get(cache_key)
-    
-    if cached_data:
-        logger.info("API: Returning cached weather forecast.")
-        return cached_data
-    
-    # Generate new forecast
-    forecast_list = generate_weather_forecast(days)
-    
-    # Cache the result
-    cache.set(cache_key, forecast_list)
-    
-    logger.info(f"API: Returning fresh forecast for {days} days.")
-    return forecast_list
+    cache_key = weather_horizon_key()
+    data = get_weather_forecast_horizon(cache_key)[:days]
+    return cached_json_response(request, data, cache, cache_key)
 
 # API: Forecast comfort score
 @app.get("/api/comfort/forecast", response_model=List[ComfortDataFromAPI])
 @limiter.limit("10/minute")  # Increased limit for individual endpoints
-async def get_comfort_forecast(request: Request, days: int = Query(7, ge=1, le=14)):
+async def get_comfort_forecast(request: Request, days: int = Query(7, ge=1, le=FORECAST_HORIZON_DAYS)):
     logger.info(f"API: Comfort forecast for {days} days requested.")
-    
-    # Check cache first
-    cache_key = get_cache_key("comfort_forecast", days=days)
-    cached_data = cache.get(cache_key)
-    
-    if cached_data:
-        logger.info("API: Returning cached comfort forecast.")
-        return cached_data
-    
-    # Generate new forecast
-    forecast_list = generate_comfort_forecast(days)
-    
-    # Cache the result
-    cache.set(cache_key, forecast_list)
-    
-    logger.info(f"API: Returning fresh comfort forecast.")
-    return forecast_list
+    cache_key = comfort_horizon_key()
+    data = get_comfort_forecast_horizon(cache_key)[:days]
+    return cached_json_response(request, data, cache, cache_key)
 
 # NEW ENDPOINT: Bundled API request
 # This allows the frontend to request multiple data types in a single API call
@@ -301,51 +430,264 @@ async def get_bundled_data(request: Request, bundle_request: BundledRequest):
     
     # Process each requested data type
     if bundle_request.current_weather:
-        cache_key = "current_weather"
-        cached_data = current_weather_cache.get(cache_key)
-        
-        if cached_data:
-            response.current_weather = cached_data
-        else:
-            current_data = generate_current_weather()
-            current_weather_cache.set(cache_key, current_data)
-            response.current_weather = current_data
+        response.current_weather = get_current_weather_data()
     
     if bundle_request.weather_forecast:
-        days = bundle_request.days
-        cache_key = get_cache_key("weather_forecast", days=days)
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            response.weather_forecast = cached_data
-        else:
-            forecast_data = generate_weather_forecast(days)
-            cache.set(cache_key, forecast_data)
-            response.weather_forecast = forecast_data
+        response.weather_forecast = get_weather_forecast_horizon()[:bundle_request.days]
     
     if bundle_request.comfort_forecast:
-        days = bundle_request.days
-        cache_key = get_cache_key("comfort_forecast", days=days)
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            response.comfort_forecast = cached_data
-        else:
-            comfort_data = generate_comfort_forecast(days)
-            cache.set(cache_key, comfort_data)
-            response.comfort_forecast = comfort_data
+        response.comfort_forecast = get_comfort_forecast_horizon()[:bundle_request.days]
     
     logger.info("API: Returning bundled response")
     return response
 
+# Streaming anomaly detection, O(1) per reading and feed
+sensor_monitor = SensorMonitor(DEFAULT_FEEDS)
+
+# API: Telemetry ingest, feeds the online forecaster
+# Readings flagged as bad (spike, out of range) are dropped here
+@app.post("/api/telemetry")
+async def ingest_telemetry(reading: TelemetryReading):
+    timestamp = reading.timestamp.timestamp() if reading.timestamp else None
+    if timestamp is not None and timestamp > time.time() + MAX_CLOCK_SKEW_SECONDS:
+        # A reading from the future would pin the forecaster's current day
+        raise HTTPException(status_code=422, detail="timestamp is in the future")
+    accepted: Dict[str, float] = {}
+    rejected: Dict[str, List[str]] = {}
+    for feed, value in reading.dict(exclude={"timestamp"}).items():
+        if value is None:
+            continue
+        verdict = sensor_monitor.check(feed, value, timestamp)
+        if verdict.ok:
+            accepted[feed] = verdict.value
+        else:
+            rejected[feed] = verdict.flags
+
+    if accepted:
+        forecaster.update(accepted, reading.timestamp)
+        if forecaster.observations % FORECASTER_SAVE_EVERY == 0:
+            await run_in_threadpool(forecaster.save, FORECASTER_STATE_PATH)
+    return {"status": "ok", "accepted": list(accepted), "rejected": rejected, "observations": forecaster.observations}
+
+# Adafruit IO feeds polled through the same SensorMonitor, so /api/sensors/health
+# covers the device feeds as well as /api/telemetry. The energy feed is read in
+# full (every point since the last one aggregated), not just its latest value.
+# Opt-in: importing mqttservice connects to the Adafruit IO broker. 0 disables.
+FEED_POLL_INTERVAL = float(os.getenv("FEED_POLL_INTERVAL", "0"))
+POLLED_FEEDS = ["temperature", "humidity", "brightness"]
+ENERGY_FEED = "energy"
+
+feed_poll_task: Optional[asyncio.Task] = None
+
+def connect_mqttservice():
+    # Imported here, not at module level: the import opens the broker connection
+    from src import mqttservice
+    return mqttservice
+
+async def poll_feeds(mqttservice) -> None:
+    logger.info(f"Polling Adafruit IO feeds {POLLED_FEEDS} every {FEED_POLL_INTERVAL}s")
+    while True:
+        for feed in POLLED_FEEDS:
+            try:
+                await run_in_threadpool(mqttservice.check_latest_from_feed, feed, sensor_monitor)
+            except Exception as e:
+                logger.error(f"Error polling feed '{feed}': {e}")
+                continue
+        try:
+            await ingest_energy_feed(mqttservice)
+        except Exception as e:
+            logger.error(f"Error polling feed '{ENERGY_FEED}': {e}")
+        if energy_aggregator.checkpoint_due():
+            await run_in_threadpool(energy_aggregator.save)
+        await asyncio.sleep(FEED_POLL_INTERVAL)
+
+async def ingest_energy_feed(mqttservice) -> int:
+    """
+    Aggregate every energy feed point exactly once. The cursor (created_at of the
+    last point and the ids seen at that instant) is checkpointed with the totals,
+    so a restart resumes where the saved totals stop. The first run starts at the
+    beginning of the current month.
+    """
+    cursor = energy_aggregator.cursors.get(ENERGY_FEED)
+    if cursor:
+        start_time = cursor["created_at"]
+    else:
+        month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start_time = month_start.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    points = await run_in_threadpool(mqttservice.get_feed_data_since, ENERGY_FEED, start_time)
+
+    added = 0
+    for point in points:
+        created_at = point["created_at"]
+        if cursor and (created_at < cursor["created_at"]
+                       or (created_at == cursor["created_at"] and point["id"] in cursor["ids"])):
+            continue
+        timestamp = mqttservice.created_at_timestamp(point)
+        verdict = sensor_monitor.check(ENERGY_FEED, point.get("value"), timestamp, sample_id=point["id"])
+        if record_energy(ENERGY_FEED_DEVICE, point.get("value"), verdict.timestamp, verdict.flags, in_total=False):
+            added += 1
+        if cursor is None or created_at > cursor["created_at"]:
+            cursor = {"created_at": created_at, "ids": []}
+        cursor["ids"].append(point["id"])
+    if cursor:
+        energy_aggregator.set_cursor(ENERGY_FEED, cursor)
+    return added
+
+async def start_feed_polling() -> None:
+    global feed_poll_task
+    if FEED_POLL_INTERVAL <= 0:
+        return
+    try:
+        mqttservice = await run_in_threadpool(connect_mqttservice)
+    except Exception as e:
+        logger.error(f"Feed polling disabled, cannot load mqttservice: {e}")
+        return
+    feed_poll_task = asyncio.create_task(poll_feeds(mqttservice))
+
+# API: Sensor feed health (rolling stats, stuck / dropout, recent alerts)
+@app.get("/api/sensors/health")
+async def get_sensor_health():
+    return sensor_monitor.status()
+
+# Energy aggregation: tumbling (minute/hour/day/month) and sliding (60 min / 24 h)
+# windows per device, updated O(1) per reading and checkpointed to disk
+ENERGY_CHECKPOINT_PATH = './logs/energy_checkpoint.json'
+# The whole-home meter on the Adafruit IO "energy" feed is kept in its own
+# bucket, separate from "all" (the sum of per-device readings)
+ENERGY_FEED_DEVICE = "home"
+
+energy_aggregator = EnergyAggregator(ENERGY_CHECKPOINT_PATH)
+
+def load_energy_aggregator():
+    global energy_aggregator
+    try:
+        if os.path.exists(ENERGY_CHECKPOINT_PATH):
+            energy_aggregator = EnergyAggregator.load(ENERGY_CHECKPOINT_PATH)
+            logger.info(f"Loaded energy checkpoint ({len(energy_aggregator.devices)} devices)")
+    except Exception as e:
+        logger.error(f"Error loading energy checkpoint: {e}")
+
+# Spike / stuck flags are reported but the consumption still counts: dropping it
+# would undercount every load change. Only impossible values stay out of the totals.
+def record_energy(device: str, value: Any, timestamp: float, flags: List[str], in_total: bool = True) -> bool:
+    if INVALID_FLAGS.intersection(flags):
+        return False
+    energy_aggregator.add(device, float(value), timestamp, in_total)
+    return True
+
+# API: Energy ingest, one reading per device ("all" is the sum and cannot be posted)
+@app.post("/api/energy/readings")
+async def ingest_energy(reading: EnergyReading):
+    if reading.device == EnergyAggregator.ALL_DEVICES:
+        raise HTTPException(status_code=422, detail=f"'{EnergyAggregator.ALL_DEVICES}' is the per-device total, post readings per device")
+    timestamp = reading.timestamp.timestamp() if reading.timestamp else time.time()
+    if timestamp > time.time() + MAX_CLOCK_SKEW_SECONDS:
+        # A reading from the future would close every current window early
+        raise HTTPException(status_code=422, detail="timestamp is in the future")
+    verdict = sensor_monitor.check(f"energy/{reading.device}", reading.value, timestamp)
+    if not record_energy(reading.device, reading.value, timestamp, verdict.flags):
+        return {"status": "rejected", "device": reading.device, "flags": verdict.flags}
+
+    if energy_aggregator.checkpoint_due():
+        await run_in_threadpool(energy_aggregator.save)
+    return {"status": "ok", "device": reading.device, "flags": verdict.flags}
+
+# API: Energy aggregates (current windows, sliding totals, optional closed windows)
+@app.get("/api/energy/aggregates")
+async def get_energy_aggregates(device: Optional[str] = None, history: int = Query(0, ge=0, le=62)):
+    summary = energy_aggregator.summary(device, history)
+    if device and not summary:
+        raise HTTPException(status_code=404, detail=f"Unknown device '{device}'")
+    return summary
+
+# Live readings stream (Server-Sent Events)
+# One producer per worker polls the cached readings and pushes only changes
+STREAM_INTERVAL = float(os.getenv("STREAM_INTERVAL", "5"))
+STREAM_HEARTBEAT = 15.0
+
+async def produce_readings() -> Dict[str, Any]:
+    return jsonable_encoder(get_current_weather_data())
+
+readings_broadcaster = Broadcaster(produce_readings, interval=STREAM_INTERVAL, buffer_size=16)
+
+@app.get("/api/stream/readings")
+async def stream_readings(request: Request):
+    async def event_stream():
+        # Subscribe only once the response is being streamed, so a client that
+        # disconnects before the first iteration never leaves a subscriber behind
+        subscriber = readings_broadcaster.subscribe()
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            readings_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Model admin: versions and manual reload
+@app.get("/api/models")
+async def get_models():
+    return model_registry.describe()
+
+@app.post("/api/admin/models/reload")
+async def reload_models(request: Request, name: Optional[str] = None, force: bool = False):
+    if not ADMIN_TOKEN or request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if name and name not in model_registry.versions():
+        raise HTTPException(status_code=404, detail=f"Unknown model '{name}'")
+
+    # Load + validate in a worker thread, off the event loop
+    status = await run_in_threadpool(model_registry.reload, name, force)
+    return {"status": status, "versions": model_registry.versions()}
+
+# Report the serving model versions on every response
+@app.middleware("http")
+async def add_model_version_header(request: Request, call_next: Callable):
+    response = await call_next(request)
+    response.headers["X-Model-Version"] = ";".join(
+        f"{name}={version or 'fallback'}" for name, version in model_registry.versions().items()
+    )
+    return response
+
+@app.on_event("startup")
+async def startup():
+    load_models()
+    load_forecaster()
+    load_energy_aggregator()
+    model_registry.start_watching()
+    await start_feed_polling()
+
+@app.on_event("shutdown")
+async def shutdown():
+    model_registry.stop_watching()
+    if feed_poll_task:
+        feed_poll_task.cancel()
+    if forecaster.observations:
+        forecaster.save(FORECASTER_STATE_PATH)
+    if energy_aggregator.devices:
+        energy_aggregator.save()
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
-    return {"status": "ok", "timestamp": time.time()}
+    return {
+        "status": "ok",
+        "timestamp": time.time(),
+        "models": model_registry.versions(),
+        "stream": readings_broadcaster.stats(),
+    }
 
 # Start app
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting FastAPI app...")
-    load_models()
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
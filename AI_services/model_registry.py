@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import math
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelEntry:
+    name: str
+    path: str
+    model: Any
+    version: str
+    mtime: float
+    loaded_at: float = field(default_factory=time.time)
+
+
+class ModelRegistry:
+    """
+    Holds the loaded models by name. A new artifact is loaded and validated
+    outside the request path (watcher thread or admin reload) and swapped in
+    with a single reference assignment, so a request always sees either the
+    old or the new ModelEntry, never a half-loaded one.
+    """
+
+    def __init__(self, poll_interval: float = 5.0):
+        self.poll_interval = poll_interval
+        self._paths: Dict[str, str] = {}
+        self._validators: Dict[str, Callable[[Any], None]] = {}
+        self._entries: Dict[str, ModelEntry] = {}
+        self._rejected_mtime: Dict[str, float] = {}
+        self._listeners: List[Callable[[str, ModelEntry], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, path: str, validator: Optional[Callable[[Any], None]] = None) -> None:
+        self._paths[name] = path
+        if validator:
+            self._validators[name] = validator
+        self.stats[name] = {"reloads": 0, "failures": 0, "last_error": None}
+
+    def on_change(self, callback: Callable[[str, ModelEntry], None]) -> None:
+        self._listeners.append(callback)
+
+    def entry(self, name: str) -> Optional[ModelEntry]:
+        return self._entries.get(name)
+
+    def get(self, name: str) -> Any:
+        entry = self._entries.get(name)
+        return entry.model if entry else None
+
+    def version(self, name: str) -> Optional[str]:
+        entry = self._entries.get(name)
+        return entry.version if entry else None
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        return {name: self.version(name) for name in self._paths}
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for name, path in self._paths.items():
+            entry = self._entries.get(name)
+            result[name] = {
+                "path": path,
+                "version": entry.version if entry else None,
+                "loaded_at": entry.loaded_at if entry else None,
+                **self.stats[name],
+            }
+        return result
+
+    def reload(self, name: Optional[str] = None, force: bool = False) -> Dict[str, str]:
+        """
+        (Re)load one model, or all of them. Artifacts whose mtime did not change
+        are skipped unless force=True. Returns a status per model name.
+        """
+        names = [name] if name else list(self._paths)
+        status = {}
+        # One reload at a time: the watcher and the admin endpoint may race
+        with self._lock:
+            for n in names:
+                status[n] = self._reload_one(n, force)
+        return status
+
+    def _reload_one(self, name: str, force: bool) -> str:
+        path = self._paths[name]
+        if not os.path.exists(path):
+            if self.stats[name]["last_error"] != "missing":
+                logger.warning(f"Model '{name}' not found at {path}")
+                self.stats[name]["last_error"] = "missing"
+            return "missing"
+
+        mtime = os.path.getmtime(path)
+        current = self._entries.get(name)
+        if current and not force and current.mtime == mtime:
+            return "unchanged"
+        if not force and self._rejected_mtime.get(name) == mtime:
+            return "failed"
+
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            version = hashlib.sha256(raw).hexdigest()[:12]
+            if current and current.version == version:
+                current.mtime = mtime
+                return "unchanged"
+
+            model = pickle.loads(raw)
+            validator = self._validators.get(name)
+            if validator:
+                validator(model)
+        except Exception as e:
+            # Keep serving the previous model
+            self.stats[name]["failures"] += 1
+            self.stats[name]["last_error"] = str(e)
+            self._rejected_mtime[name] = mtime
+            logger.error(f"Rejected model '{name}' from {path}: {e}")
+            return "failed"
+
+        entry = ModelEntry(name=name, path=path, model=model, version=version, mtime=mtime)
+        self._entries[name] = entry
+        self.stats[name]["reloads"] += 1
+        self.stats[name]["last_error"] = None
+        logger.info(f"Loaded model '{name}' version {version} from {path}")
+
+        for callback in self._listeners:
+            try:
+                callback(name, entry)
+            except Exception as e:
+                logger.error(f"Model change listener failed for '{name}': {e}")
+        return "loaded"
+
+    def start_watching(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+
+
+def make_predict_validator(columns: List[str], sample: List[float]) -> Callable[[Any], None]:
+    """
+    Validator that runs one prediction on a probe row and checks the output
+    is a finite number.
+    """
+    import pandas as pd
+
+    probe = pd.DataFrame([sample], columns=columns)
+
+    def validate(model: Any) -> None:
+        if not hasattr(model, "predict"):
+            raise ValueError("artifact has no predict()")
+        value = float(model.predict(probe)[0])
+        if not math.isfinite(value):
+            raise ValueError(f"probe prediction is not finite: {value}")
+
+    return validate
@@ -0,0 +1,201 @@
+# File: src/anomaly_detection.py
+#
+# Phát hiện bất thường dạng streaming cho các feed cảm biến. Mỗi feed chỉ giữ
+# vài con số (bộ nhớ hằng) và xử lý mỗi mẫu O(1):
+#   - invalid / out_of_range: giá trị không phải số, NaN, ngoài giới hạn vật lý
+#   - spike:  |x - mean| / std > z_threshold  (Welford lúc khởi động, sau đó EWMA)
+#   - stuck:  cùng một giá trị lặp lại quá stuck_count lần (chỉ cảnh báo)
+#   - change: CUSUM hai phía phát hiện mức nền dịch chuyển thật (chấp nhận và học lại)
+#   - dropout: quá dropout_seconds không có mẫu mới
+# Mẫu bị đánh dấu spike / invalid / out_of_range bị loại (ok=False) và không
+# cập nhật thống kê. Phòng giữ nhiệt độ ổn định là bình thường nên stuck chỉ
+# được báo trong status / alerts, mẫu vẫn được nhận.
+import math
+import time
+from collections import deque, namedtuple
+
+Verdict = namedtuple("Verdict", ["feed", "value", "ok", "flags", "zscore", "timestamp"])
+
+REJECTING_FLAGS = {"invalid", "out_of_range", "spike"}
+# Giá trị không thể đúng về mặt vật lý; dùng cho số liệu cộng dồn (điện năng),
+# nơi spike vẫn phải được tính
+INVALID_FLAGS = {"invalid", "out_of_range"}
+
+
+class FeedDetector:
+    def __init__(self, name, low=None, high=None, alpha=0.05, z_threshold=4.0, warmup=10,
+                 min_std=1e-3, stuck_count=20, cusum_k=0.5, cusum_h=8.0, dropout_seconds=300):
+        self.name = name
+        self.low = low
+        self.high = high
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.min_std = min_std
+        self.stuck_count = stuck_count
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.dropout_seconds = dropout_seconds
+
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self._m2 = 0.0
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.last_value = None
+        self.repeat = 0
+        self.last_seen = None
+        self.total = 0
+        self.rejected = 0
+        self.last_sample_id = None
+        self.last_verdict = None
+
+    @property
+    def std(self):
+        return max(math.sqrt(self.var), self.min_std)
+
+    def _learn(self, x):
+        self.n += 1
+        if self.n <= self.warmup:
+            # Welford
+            delta = x - self.mean
+            self.mean += delta / self.n
+            self._m2 += delta * (x - self.mean)
+            self.var = self._m2 / (self.n - 1) if self.n > 1 else 0.0
+        else:
+            # EWMA mean / variance
+            diff = x - self.mean
+            incr = self.alpha * diff
+            self.mean += incr
+            self.var = (1 - self.alpha) * (self.var + diff * incr)
+
+    def _reset_stats(self):
+        self.n = 0
+        self.mean = self.var = self._m2 = 0.0
+        self.cusum_pos = self.cusum_neg = 0.0
+
+    def check(self, value, timestamp=None, sample_id=None):
+        """
+        Kiểm tra một mẫu. Gọi lại với cùng sample_id (ví dụ poll REST trả lại
+        cùng điểm dữ liệu) thì trả về verdict cũ, không tính là mẫu mới.
+        """
+        if sample_id is not None and sample_id == self.last_sample_id and self.last_verdict:
+            return self.last_verdict
+        timestamp = timestamp if timestamp is not None else time.time()
+        flags = []
+        zscore = None
+
+        try:
+            x = float(value)
+        except (TypeError, ValueError):
+            x = None
+        if x is None or not math.isfinite(x):
+            flags.append("invalid")
+        else:
+            self.last_seen = timestamp
+            if (self.low is not None and x < self.low) or (self.high is not None and x > self.high):
+                flags.append("out_of_range")
+
+            self.repeat = self.repeat + 1 if x == self.last_value else 1
+            self.last_value = x
+            if self.repeat >= self.stuck_count:
+                flags.append("stuck")
+
+            if self.n >= self.warmup and not flags:
+                zscore = (x - self.mean) / self.std
+                # CUSUM trên độ lệch chuẩn hóa (cắt ở z_threshold để một spike
+                # đơn lẻ không đủ kích hoạt): dịch chuyển kéo dài -> change
+                clipped = max(-self.z_threshold, min(self.z_threshold, zscore))
+                self.cusum_pos = max(0.0, self.cusum_pos + clipped - self.cusum_k)
+                self.cusum_neg = max(0.0, self.cusum_neg - clipped - self.cusum_k)
+                if self.cusum_pos > self.cusum_h or self.cusum_neg > self.cusum_h:
+                    flags.append("change")
+                    self._reset_stats()
+                elif abs(zscore) > self.z_threshold:
+                    flags.append("spike")
+
+            if not REJECTING_FLAGS.intersection(flags):
+                self._learn(x)
+
+        ok = not REJECTING_FLAGS.intersection(flags)
+        self.total += 1
+        if not ok:
+            self.rejected += 1
+        verdict = Verdict(self.name, x if ok else None, ok, flags, zscore, timestamp)
+        self.last_sample_id = sample_id
+        self.last_verdict = verdict
+        return verdict
+
+    def dropout(self, now=None):
+        if self.last_seen is None:
+            return False
+        now = now if now is not None else time.time()
+        return now - self.last_seen > self.dropout_seconds
+
+    def status(self, now=None):
+        return {
+            "samples": self.total,
+            "rejected": self.rejected,
+            "mean": round(self.mean, 4) if self.n else None,
+            "std": round(math.sqrt(self.var), 4) if self.n > 1 else None,
+            "last_value": self.last_value,
+            "last_seen": self.last_seen,
+            "stuck": self.repeat >= self.stuck_count,
+            "dropout": self.dropout(now),
+            "warming_up": self.n < self.warmup,
+        }
+
+
+class SensorMonitor:
+    """
+    Một FeedDetector cho mỗi feed, cộng danh sách cảnh báo gần nhất (giới hạn).
+    """
+
+    def __init__(self, feeds, max_alerts=100):
+        self.feeds = feeds
+        self.detectors = {name: FeedDetector(name, **params) for name, params in feeds.items()}
+        self.alerts = deque(maxlen=max_alerts)
+
+    def check(self, feed, value, timestamp=None, sample_id=None):
+        """
+        Feed chưa có detector được tạo khi gặp lần đầu; "energy/fan" dùng cấu
+        hình của "energy".
+        """
+        detector = self.detectors.get(feed)
+        if detector is None:
+            params = self.feeds.get(feed.split("/")[0], {})
+            detector = self.detectors[feed] = FeedDetector(feed, **params)
+        previous = detector.last_verdict
+        verdict = detector.check(value, timestamp, sample_id)
+        if verdict.flags and verdict is not previous:
+            self.alerts.append({
+                "feed": feed,
+                "value": value,
+                "flags": verdict.flags,
+                "zscore": round(verdict.zscore, 2) if verdict.zscore is not None else None,
+                "timestamp": verdict.timestamp,
+            })
+        return verdict
+
+    def status(self, now=None):
+        return {
+            "feeds": {name: d.status(now) for name, d in self.detectors.items()},
+            "alerts": list(self.alerts),
+        }
+
+
+# Giới hạn vật lý của các feed trên Adafruit IO / telemetry API.
+# min_std không nhỏ hơn độ phân giải của cảm biến: cảm biến báo số nguyên đứng
+# yên ở 30 rồi lên 31 không được coi là spike.
+# Ánh sáng ban đêm và điện năng khi tắt thiết bị đứng yên lâu là bình thường,
+# nên ngưỡng stuck của các feed đó cao hơn.
+DEFAULT_FEEDS = {
+    "temperature": {"low": -20.0, "high": 60.0, "min_std": 0.5, "stuck_count": 720},
+    "humidity": {"low": 0.0, "high": 100.0, "min_std": 0.5, "stuck_count": 720},
+    "brightness": {"low": 0.0, "min_std": 1.0, "stuck_count": 240},
+    "light": {"low": 0.0, "min_std": 1.0, "stuck_count": 240},
+    "energy": {"low": 0.0, "min_std": 0.01, "stuck_count": 720},
+    "pressure": {"low": 850.0, "high": 1100.0, "min_std": 0.5},
+    "windSpeed": {"low": 0.0, "high": 100.0, "min_std": 0.5},
+}
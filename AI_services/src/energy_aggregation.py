@@ -0,0 +1,289 @@
+# File: src/energy_aggregation.py
+#
+# Tổng hợp điện năng theo cửa sổ thời gian, cập nhật O(1) mỗi mẫu, theo từng
+# thiết bị:
+#   - tumbling: phút / giờ / ngày / tháng hiện tại (+ một số cửa sổ đã đóng gần nhất)
+#   - sliding: 60 phút và 24 giờ gần nhất, giữ bằng vòng bucket theo phút /
+#     theo giờ với tổng chạy (bucket hết hạn bị trừ ra khi vòng quay qua)
+# Mỗi mẫu là lượng điện tiêu thụ (kWh) kể từ mẫu trước của thiết bị đó.
+# State được checkpoint ra JSON để restart không phải quét lại lịch sử.
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+TUMBLING_WINDOWS = ("minute", "hour", "day", "month")
+CLOSED_HISTORY = {"minute": 60, "hour": 48, "day": 62, "month": 24}
+
+
+def window_key(window, ts):
+    # Ranh giới phút / giờ / ngày / tháng theo giờ địa phương của server
+    dt = datetime.fromtimestamp(ts)
+    if window == "minute":
+        return dt.strftime("%Y-%m-%dT%H:%M")
+    if window == "hour":
+        return dt.strftime("%Y-%m-%dT%H")
+    if window == "day":
+        return dt.strftime("%Y-%m-%d")
+    return dt.strftime("%Y-%m")
+
+
+class WindowStats:
+    __slots__ = ("key", "total", "count", "min", "max")
+
+    def __init__(self, key):
+        self.key = key
+        self.total = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.total += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "total": round(self.total, 6),
+            "count": self.count,
+            "average": round(self.total / self.count, 6) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    def to_state(self):
+        return {"key": self.key, "total": self.total, "count": self.count, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls(state["key"])
+        stats.total, stats.count, stats.min, stats.max = state["total"], state["count"], state["min"], state["max"]
+        return stats
+
+
+class SlidingSum:
+    """
+    Tổng trượt trên `size` bucket, mỗi bucket dài `bucket_seconds`.
+    Thêm mẫu O(1) (khoảng trống dài hơn cả cửa sổ thì reset luôn).
+    """
+
+    def __init__(self, bucket_seconds, size):
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+        self.buckets = [0.0] * size
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+        self.head = None  # index tuyệt đối của bucket mới nhất
+
+    def _advance(self, index):
+        if self.head is None or index - self.head >= self.size:
+            self.buckets = [0.0] * self.size
+            self.counts = [0] * self.size
+            self.total, self.count = 0.0, 0
+            self.head = index
+            return
+        while self.head < index:
+            self.head += 1
+            slot = self.head % self.size
+            self.total -= self.buckets[slot]
+            self.count -= self.counts[slot]
+            self.buckets[slot], self.counts[slot] = 0.0, 0
+
+    def add(self, value, ts):
+        index = int(ts // self.bucket_seconds)
+        if self.head is not None and index <= self.head - self.size:
+            return  # quá cũ, đã ra khỏi cửa sổ
+        if self.head is None or index > self.head:
+            self._advance(index)
+        slot = index % self.size
+        self.buckets[slot] += value
+        self.counts[slot] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self, now):
+        # Trả về tổng đến `now` mà không làm thay đổi state
+        index = int(now // self.bucket_seconds)
+        if self.head is None or index - self.head >= self.size:
+            return 0.0, 0
+        total, count = self.total, self.count
+        for i in range(self.head + 1, index + 1):
+            slot = i % self.size
+            total -= self.buckets[slot]
+            count -= self.counts[slot]
+        return total, count
+
+    def to_dict(self):
+        return {"buckets": self.buckets, "counts": self.counts, "total": self.total,
+                "count": self.count, "head": self.head}
+
+    def load(self, state):
+        self.buckets, self.counts = state["buckets"], state["counts"]
+        self.total, self.count, self.head = state["total"], state["count"], state["head"]
+
+
+SLIDING_WINDOWS = {
+    "last_60_minutes": (60, 60),
+    "last_24_hours": (3600, 24),
+}
+
+
+class DeviceAggregator:
+    def __init__(self):
+        self.current = {}
+        self.closed = {w: deque(maxlen=CLOSED_HISTORY[w]) for w in TUMBLING_WINDOWS}
+        self.sliding = {name: SlidingSum(*params) for name, params in SLIDING_WINDOWS.items()}
+        self.lifetime_total = 0.0
+        self.samples = 0
+        self.last_ts = None
+
+    def add(self, value, ts):
+        for window in TUMBLING_WINDOWS:
+            key = window_key(window, ts)
+            stats = self.current.get(window)
+            if stats is None or key > stats.key:
+                if stats is not None:
+                    self.closed[window].append(stats)
+                stats = self.current[window] = WindowStats(key)
+            elif key < stats.key:
+                continue  # mẫu đến trễ thuộc cửa sổ đã đóng
+            stats.add(value)
+        for sliding in self.sliding.values():
+            sliding.add(value, ts)
+        self.lifetime_total += value
+        self.samples += 1
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+    def summary(self, now, history=0):
+        result = {
+            "lifetime_total": round(self.lifetime_total, 6),
+            "samples": self.samples,
+            "last_sample": self.last_ts,
+            "current": {},
+            "sliding": {},
+        }
+        for window in TUMBLING_WINDOWS:
+            stats = self.current.get(window)
+            # Cửa sổ hiện tại đã hết (không có mẫu mới) thì trả về rỗng
+            if stats is not None and stats.key == window_key(window, now):
+                result["current"][window] = stats.to_dict()
+            else:
+                result["current"][window] = WindowStats(window_key(window, now)).to_dict()
+        for name, sliding in self.sliding.items():
+            total, count = sliding.snapshot(now)
+            result["sliding"][name] = {"total": round(total, 6), "count": count}
+        if history:
+            result["history"] = {w: [s.to_dict() for s in list(self.closed[w])[-history:]] for w in TUMBLING_WINDOWS}
+        return result
+
+    def to_dict(self):
+        return {
+            "current": {w: s.to_state() for w, s in self.current.items()},
+            "closed": {w: [s.to_state() for s in q] for w, q in self.closed.items()},
+            "sliding": {name: s.to_dict() for name, s in self.sliding.items()},
+            "lifetime_total": self.lifetime_total,
+            "samples": self.samples,
+            "last_ts": self.last_ts,
+        }
+
+    def load(self, state):
+        self.current = {w: WindowStats.from_dict(s) for w, s in state["current"].items()}
+        for w, items in state["closed"].items():
+            self.closed[w].extend(WindowStats.from_dict(s) for s in items)
+        for name, s in state["sliding"].items():
+            if name in self.sliding:
+                self.sliding[name].load(s)
+        self.lifetime_total = state["lifetime_total"]
+        self.samples = state["samples"]
+        self.last_ts = state["last_ts"]
+
+
+class EnergyAggregator:
+    """
+    Một DeviceAggregator cho mỗi thiết bị, cộng tổng "all" của các thiết bị.
+    Checkpoint ra file JSON (ghi file tạm rồi os.replace) mỗi
+    `checkpoint_every` mẫu hoặc `checkpoint_seconds` giây.
+    """
+
+    ALL_DEVICES = "all"
+
+    def __init__(self, checkpoint_path=None, checkpoint_every=500, checkpoint_seconds=60.0):
+        self.devices = {}
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        # Vị trí đã đọc tới của các nguồn bên ngoài (ví dụ feed Adafruit IO),
+        # lưu cùng checkpoint để restart không cộng lại hay bỏ sót điểm nào
+        self.cursors = {}
+        self._dirty = 0
+        self._last_checkpoint = time.time()
+        self._lock = threading.Lock()
+
+    def _device(self, device):
+        aggregator = self.devices.get(device)
+        if aggregator is None:
+            aggregator = self.devices[device] = DeviceAggregator()
+        return aggregator
+
+    def add(self, device, value, ts=None, in_total=True):
+        """
+        in_total=False cho số đo của cả nhà (công tơ tổng): giữ riêng, không
+        cộng vào "all" để không tính trùng với các thiết bị con.
+        """
+        if device == self.ALL_DEVICES:
+            raise ValueError(f'"{self.ALL_DEVICES}" là tổng các thiết bị, không nhận số đo trực tiếp')
+        ts = ts if ts is not None else time.time()
+        with self._lock:
+            self._device(device).add(value, ts)
+            if in_total:
+                self._device(self.ALL_DEVICES).add(value, ts)
+            self._dirty += 1
+
+    def set_cursor(self, source, cursor):
+        with self._lock:
+            self.cursors[source] = cursor
+
+    def checkpoint_due(self):
+        return self.checkpoint_path and self._dirty and (
+            self._dirty >= self.checkpoint_every or time.time() - self._last_checkpoint >= self.checkpoint_seconds
+        )
+
+    def summary(self, device=None, history=0, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            if device:
+                aggregator = self.devices.get(device)
+                return {device: aggregator.summary(now, history)} if aggregator else {}
+            return {name: a.summary(now, history) for name, a in self.devices.items()}
+
+    def save(self, path=None):
+        path = path or self.checkpoint_path
+        with self._lock:
+            state = {
+                "saved_at": time.time(),
+                "devices": {name: a.to_dict() for name, a in self.devices.items()},
+                "cursors": dict(self.cursors),
+            }
+            self._dirty = 0
+            self._last_checkpoint = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        aggregator = cls(checkpoint_path=path, **kwargs)
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        for name, device_state in state["devices"].items():
+            aggregator._device(name).load(device_state)
+        aggregator.cursors = state.get("cursors", {})
+        return aggregator
@@ -0,0 +1,294 @@
+# File: src/model_search.py
+#
+# Search several model families for the weather / comfort predictors and pick
+# one on the accuracy / latency trade-off instead of accuracy alone.
+#
+# Usage (run from AI_services/):
+#   python src/model_search.py --target comfort
+#   python src/model_search.py --target weather --max-latency-ms 0.5 --workers 4
+import argparse
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (
+    ExtraTreesRegressor,
+    GradientBoostingRegressor,
+    HistGradientBoostingRegressor,
+    RandomForestRegressor,
+)
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.model_selection import KFold, cross_validate
+from sklearn.tree import DecisionTreeRegressor
+from threadpoolctl import threadpool_limits
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '../model')
+LOG_DIR = os.path.join(os.path.dirname(__file__), '../logs')
+
+# === Synthetic data, same generators as the prediction.py scripts ===
+IDEAL_TEMP_LOW = 22.0
+IDEAL_TEMP_HIGH = 25.0
+IDEAL_HUMIDITY_LOW = 40.0
+IDEAL_HUMIDITY_HIGH = 60.0
+IDEAL_LIGHT_LOW = 40.0
+IDEAL_LIGHT_HIGH = 70.0
+
+PENALTY_TEMP = 3.0
+PENALTY_HUMIDITY = 1.5
+PENALTY_LIGHT = 1.0
+
+
+def calculate_comfort(temperature, humidity, light_scaled_0_100):
+    comfort_score = 100.0
+
+    if temperature < IDEAL_TEMP_LOW:
+        comfort_score -= PENALTY_TEMP * (IDEAL_TEMP_LOW - temperature)
+    elif temperature > IDEAL_TEMP_HIGH:
+        comfort_score -= PENALTY_TEMP * (temperature - IDEAL_TEMP_HIGH)
+
+    if humidity < IDEAL_HUMIDITY_LOW:
+        comfort_score -= PENALTY_HUMIDITY * (IDEAL_HUMIDITY_LOW - humidity)
+    elif humidity > IDEAL_HUMIDITY_HIGH:
+        comfort_score -= PENALTY_HUMIDITY * (humidity - IDEAL_HUMIDITY_HIGH)
+
+    if light_scaled_0_100 < IDEAL_LIGHT_LOW:
+        comfort_score -= PENALTY_LIGHT * (IDEAL_LIGHT_LOW - light_scaled_0_100)
+    elif light_scaled_0_100 > IDEAL_LIGHT_HIGH:
+        comfort_score -= PENALTY_LIGHT * (light_scaled_0_100 - IDEAL_LIGHT_HIGH)
+
+    comfort_score = max(0.0, min(100.0, comfort_score))
+
+    return round(comfort_score, 2)
+
+
+def make_weather_data(np_samples=1000):
+    np.random.seed(0)
+    humidity = np.random.uniform(0, 100, np_samples)
+    pressure = np.random.uniform(980, 1050, np_samples)
+    wind_speed = np.random.uniform(0, 30, np_samples)
+    temperature = 29 + 0.1 * humidity - 0.01 * pressure + 0.05 * wind_speed + np.random.normal(0, 2, np_samples)
+
+    x = pd.DataFrame({'Humidity': humidity, 'Pressure': pressure, 'Wind Speed': wind_speed})
+    y = pd.Series(temperature, name='Temperature')
+    return x, y
+
+
+def make_comfort_data(np_samples=1000):
+    np.random.seed(0)
+    temperature = np.random.uniform(15, 35, np_samples)
+    humidity = np.random.uniform(0, 100, np_samples)
+    light_scaled = np.random.uniform(0, 100, np_samples)
+    comfort_score = np.array([calculate_comfort(t, h, l) for t, h, l in zip(temperature, humidity, light_scaled)])
+
+    x = pd.DataFrame({'Temperature': temperature, 'Humidity': humidity, 'Light': light_scaled})
+    y = pd.Series(comfort_score, name='Comfort_Score')
+    return x, y
+
+
+TARGETS = {
+    'weather': (make_weather_data, 'weather_model.pkl'),
+    'comfort': (make_comfort_data, 'comfort_model.pkl'),
+}
+
+# === Candidate model families and their hyperparameter grids ===
+# Every estimator runs single-threaded: the process pool already spreads the
+# candidates over all cores, nesting n_jobs would oversubscribe them.
+# HistGradientBoosting has no n_jobs and uses OpenMP instead, so each worker
+# process is also limited to one native thread (see limit_worker_threads).
+FAMILIES = {
+    'linear': (LinearRegression, [{}]),
+    'ridge': (Ridge, [{'alpha': a} for a in (0.1, 1.0, 10.0)]),
+    'decision_tree': (DecisionTreeRegressor, [
+        {'max_depth': d, 'random_state': 42} for d in (4, 8, 12)
+    ]),
+    'random_forest': (RandomForestRegressor, [
+        {'n_estimators': n, 'max_depth': d, 'n_jobs': 1, 'random_state': 42}
+        for n in (50, 200) for d in (8, None)
+    ]),
+    'extra_trees': (ExtraTreesRegressor, [
+        {'n_estimators': n, 'max_depth': d, 'n_jobs': 1, 'random_state': 42}
+        for n in (50, 200) for d in (8, None)
+    ]),
+    'gradient_boosting': (GradientBoostingRegressor, [
+        {'n_estimators': n, 'max_depth': d, 'learning_rate': 0.1, 'random_state': 42}
+        for n in (100, 300) for d in (2, 3)
+    ]),
+    'hist_gradient_boosting': (HistGradientBoostingRegressor, [
+        {'max_iter': n, 'max_depth': d, 'random_state': 42}
+        for n in (100, 300) for d in (3, None)
+    ]),
+}
+
+
+def limit_worker_threads():
+    # Initializer của process pool: giới hạn OpenMP / BLAS còn 1 thread mỗi worker,
+    # nếu không latency_ms đo được sẽ bị méo do tranh CPU
+    threadpool_limits(1)
+
+
+def measure_latency_ms(model, x, n_rows=200):
+    """
+    Thời gian dự đoán trung bình cho MỘT dòng (ms), đo giống cách API gọi model:
+    mỗi request là một DataFrame 1 dòng.
+    """
+    rows = [x.iloc[[i]] for i in range(min(n_rows, len(x)))]
+    model.predict(rows[0])  # warm-up
+    start = time.perf_counter()
+    for row in rows:
+        model.predict(row)
+    return (time.perf_counter() - start) * 1000 / len(rows)
+
+
+def evaluate_candidate(target, family, params, folds):
+    """
+    Chạy cross-validation cho một cấu hình, sau đó fit lại trên toàn bộ dữ liệu
+    để đo latency mỗi dòng và kích thước artifact.
+    Chạy trong process con nên tự sinh lại dữ liệu thay vì nhận qua pickle.
+    """
+    make_data, _ = TARGETS[target]
+    x, y = make_data()
+    estimator_cls, _ = FAMILIES[family]
+
+    cv = KFold(n_splits=folds, shuffle=True, random_state=42)
+    start = time.perf_counter()
+    scores = cross_validate(estimator_cls(**params), x, y, cv=cv, scoring=('neg_mean_absolute_error', 'r2'), n_jobs=1)
+    cv_seconds = time.perf_counter() - start
+    mae = -scores['test_neg_mean_absolute_error']
+
+    model = estimator_cls(**params)
+    model.fit(x, y)
+
+    return {
+        'family': family,
+        'params': params,
+        'cv_mae': mae.mean(),
+        'cv_mae_std': mae.std(),
+        'cv_r2': scores['test_r2'].mean(),
+        'latency_ms': measure_latency_ms(model, x),
+        'artifact_kb': len(pickle.dumps(model)) / 1024,
+        'cv_seconds': cv_seconds,
+    }
+
+
+def select_model(results, max_latency_ms=None, max_artifact_kb=None, mae_tolerance=0.05):
+    """
+    Chọn trên Pareto front (MAE, latency) của các model thỏa ngân sách latency /
+    kích thước: model NHANH NHẤT có MAE không quá (1 + mae_tolerance) lần MAE
+    tốt nhất, để không đổi vài % sai số lấy latency gấp nhiều lần.
+    Nếu không có model nào thỏa ngân sách, chọn model nhanh nhất.
+    """
+    eligible = [
+        r for r in results
+        if (max_latency_ms is None or r['latency_ms'] <= max_latency_ms)
+        and (max_artifact_kb is None or r['artifact_kb'] <= max_artifact_kb)
+    ]
+    if not eligible:
+        return min(results, key=lambda r: r['latency_ms'])
+    front = pareto_front(eligible)
+    best_mae = min(r['cv_mae'] for r in front)
+    acceptable = [r for r in front if r['cv_mae'] <= best_mae * (1 + mae_tolerance)]
+    return min(acceptable, key=lambda r: (r['latency_ms'], r['cv_mae']))
+
+
+def pareto_front(results):
+    """
+    Các model không bị model khác vượt trội đồng thời về MAE và latency.
+    """
+    front = []
+    for r in results:
+        dominated = any(
+            o['cv_mae'] <= r['cv_mae'] and o['latency_ms'] <= r['latency_ms']
+            and (o['cv_mae'] < r['cv_mae'] or o['latency_ms'] < r['latency_ms'])
+            for o in results
+        )
+        if not dominated:
+            front.append(r)
+    return front
+
+
+def run_search(target, folds=5, workers=None, families=None):
+    workers = workers or os.cpu_count() or 1
+    families = families or list(FAMILIES)
+    candidates = [(family, params) for family in families for params in FAMILIES[family][1]]
+
+    print(f'Evaluating {len(candidates)} candidates for "{target}" on {workers} processes...')
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=limit_worker_threads) as executor:
+        futures = [executor.submit(evaluate_candidate, target, family, params, folds) for family, params in candidates]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"  {result['family']:<24} MAE={result['cv_mae']:.3f} latency={result['latency_ms']:.3f}ms")
+    return results
+
+
+def write_report(target, results, chosen):
+    front = pareto_front(results)
+    report = pd.DataFrame([
+        {
+            'family': r['family'],
+            'params': r['params'],
+            'cv_mae': round(r['cv_mae'], 4),
+            'cv_mae_std': round(r['cv_mae_std'], 4),
+            'cv_r2': round(r['cv_r2'], 4),
+            'latency_ms': round(r['latency_ms'], 4),
+            'artifact_kb': round(r['artifact_kb'], 1),
+            'cv_seconds': round(r['cv_seconds'], 2),
+            'pareto': r in front,
+            'chosen': r is chosen,
+        }
+        for r in results
+    ]).sort_values(['cv_mae', 'latency_ms'])
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    report_path = os.path.join(LOG_DIR, f'{target}_model_report.csv')
+    report.to_csv(report_path, index=False)
+
+    with pd.option_context('display.max_colwidth', 60, 'display.width', 200):
+        print(report.to_string(index=False))
+    print(f'\nModel report saved to {report_path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model family / hyperparameter search')
+    parser.add_argument('--target', choices=list(TARGETS), default='comfort')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help='Default: all CPU cores')
+    parser.add_argument('--families', nargs='+', choices=list(FAMILIES), default=None)
+    parser.add_argument('--max-latency-ms', type=float, default=None, help='Per-row inference budget')
+    parser.add_argument('--max-artifact-kb', type=float, default=None)
+    parser.add_argument('--mae-tolerance', type=float, default=0.05,
+                        help='Pick the fastest Pareto model within this relative MAE of the best (0.05 = 5%%)')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the report, do not write model/')
+    args = parser.parse_args()
+
+    results = run_search(args.target, args.folds, args.workers, args.families)
+    chosen = select_model(results, args.max_latency_ms, args.max_artifact_kb, args.mae_tolerance)
+    write_report(args.target, results, chosen)
+
+    print(f"\nChosen: {chosen['family']} {chosen['params']} "
+          f"(MAE={chosen['cv_mae']:.3f}, latency={chosen['latency_ms']:.3f}ms, size={chosen['artifact_kb']:.1f}KB)")
+    if args.dry_run:
+        return
+
+    make_data, model_file = TARGETS[args.target]
+    x, y = make_data()
+    estimator_cls, _ = FAMILIES[chosen['family']]
+    model = estimator_cls(**chosen['params'])
+    model.fit(x, y)
+
+    # Ghi file tạm rồi os.replace: ModelRegistry đang poll thư mục model/
+    # không bao giờ thấy file ghi dở
+    model_path = os.path.join(MODEL_DIR, model_file)
+    tmp_path = model_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, model_path)
+    print(f'Model saved to {model_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,17 @@
 
 import os
 import ssl
+from datetime import datetime
 import paho.mqtt.client as mqtt
 import requests
 
+# Import được cả dạng package (src.mqttservice, từ API) lẫn module phẳng
+# (mqttservice, từ các script trong src/)
+if __package__:
+    from .anomaly_detection import DEFAULT_FEEDS, SensorMonitor
+else:
+    from anomaly_detection import DEFAULT_FEEDS, SensorMonitor
+
 # === Thiết lập từ biến môi trường hoặc giá trị mặc định ===
 ADAFRUIT_USERNAME = 'Hellosine'
 ADAFRUIT_IO_KEY   = 'aio_mStR74qgprQUBF5F3UXCTcPdIlay'
@@ -38,39 +46,132 @@ client.on_log     = on_log
 client.connect(MQTT_BROKER, MQTT_PORT)
 client.loop_start()
 
-def publish_to_feed(feed: str, payload: str) -> None:
+def publish_to_feed(feed: str, payload: str, qos: int = 0):
     """
     Gửi payload (chuỗi) tới feed name trên Adafruit IO.
     
     Ví dụ feed="temperature" sẽ publish lên topic:
       <USERNAME>/feeds/temperature
+
+    Trả về MQTTMessageInfo; với qos=1 có thể chờ broker xác nhận (PUBACK)
+    bằng wait_for_ack().
     """
     if payload is None:
-        return
+        return None
     topic = f"{ADAFRUIT_USERNAME}/feeds/{feed}"
-    result = client.publish(topic, payload)
+    result = client.publish(topic, payload, qos=qos)
     
     # result: tuple (rc, mid)
     if result.rc != mqtt.MQTT_ERR_SUCCESS:
         print('Lỗi gửi MQTT:', mqtt.error_string(result.rc))
     else:
         print(f'Đã gửi "{payload}" đến "{topic}"')
+    return result
 
-def get_latest_from_feed(feed: str) -> str:
+def wait_for_ack(result, timeout: float = 5.0) -> bool:
+    """
+    Chờ message được gửi xong (qos=0) hoặc broker xác nhận (qos=1).
+    """
+    if result is None or result.rc != mqtt.MQTT_ERR_SUCCESS:
+        return False
+    try:
+        result.wait_for_publish(timeout)
+    except (ValueError, RuntimeError) as e:
+        print('Lỗi chờ xác nhận MQTT:', e)
+        return False
+    return result.is_published()
+
+def get_latest_data_from_feed(feed: str) -> dict:
     """
-    Lấy giá trị mới nhất từ feed trên Adafruit IO.
+    Lấy điểm dữ liệu mới nhất (value, id, created_at, ...) từ feed trên Adafruit IO.
     """
     url = f"{ADAFRUIT_IO_BASE_URL}/{ADAFRUIT_USERNAME}/feeds/{feed}/data/last"
     headers = {"X-AIO-Key": ADAFRUIT_IO_KEY}
     try:
         resp = requests.get(url, headers=headers, timeout=5)
         resp.raise_for_status()
-        data = resp.json()
-        return data.get("value")
+        return resp.json()
     except Exception as e:
         print(f"Lỗi lấy dữ liệu từ feed '{feed}': {e}")
         return None
 
+def get_feed_data_since(feed: str, start_time: str = None, page_size: int = 1000) -> list:
+    """
+    Mọi điểm dữ liệu của feed có created_at >= start_time (ISO 8601), cũ nhất
+    trước. API trả về mới nhất trước, tối đa page_size điểm mỗi trang, nên đi
+    lùi bằng end_time cho đến khi hết. Lỗi mạng được ném ra để lần poll sau
+    thử lại từ cùng start_time.
+    """
+    url = f"{ADAFRUIT_IO_BASE_URL}/{ADAFRUIT_USERNAME}/feeds/{feed}/data"
+    headers = {"X-AIO-Key": ADAFRUIT_IO_KEY}
+    params = {"limit": page_size}
+    if start_time:
+        params["start_time"] = start_time
+    points = {}
+    while True:
+        resp = requests.get(url, headers=headers, params=params, timeout=10)
+        resp.raise_for_status()
+        page = resp.json()
+        new = [p for p in page if p["id"] not in points]
+        points.update((p["id"], p) for p in page)
+        # end_time bao gồm cả mốc đó nên các trang chồng nhau; dừng khi trang không có gì mới
+        if len(page) < page_size or not new:
+            break
+        params["end_time"] = min(p["created_at"] for p in page)
+    return sorted(points.values(), key=lambda p: p["created_at"])
+
+def get_latest_from_feed(feed: str) -> str:
+    """
+    Lấy giá trị mới nhất từ feed trên Adafruit IO (chưa qua kiểm tra bất thường).
+    """
+    data = get_latest_data_from_feed(feed)
+    return data.get("value") if data else None
+
+# === Kiểm tra bất thường cho các feed cảm biến ===
+sensor_monitor = SensorMonitor(DEFAULT_FEEDS)
+
+def created_at_timestamp(data: dict):
+    # Thời điểm cảm biến gửi dữ liệu (epoch), để phát hiện dropout theo thời gian thật của sensor
+    try:
+        return datetime.fromisoformat(data["created_at"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        return None
+
+def check_latest_from_feed(feed: str, monitor: SensorMonitor = None):
+    """
+    Lấy điểm dữ liệu mới nhất của feed và cho qua bộ phát hiện bất thường
+    (`monitor`, mặc định sensor_monitor của module này).
+    Trả về (data, verdict, new); new=False nếu đó là điểm đã kiểm tra ở lần
+    poll trước (cùng id), khi đó verdict là kết quả cũ.
+    """
+    monitor = monitor or sensor_monitor
+    data = get_latest_data_from_feed(feed)
+    if data is None:
+        return None, None, False
+    previous = monitor.detectors.get(feed)
+    previous = previous.last_verdict if previous else None
+    verdict = monitor.check(feed, data.get("value"), created_at_timestamp(data), sample_id=data.get("id"))
+    return data, verdict, verdict is not previous
+
+def get_checked_from_feed(feed: str):
+    """
+    Giá trị mới nhất của feed sau khi qua bộ phát hiện bất thường: trả về
+    float, hoặc None nếu bị loại (spike, ngoài giới hạn, không đọc được).
+    Poll lại cùng một điểm dữ liệu (cùng id) không bị tính là mẫu mới.
+    """
+    data, verdict, new = check_latest_from_feed(feed)
+    if verdict is None:
+        return None
+    if new and not verdict.ok:
+        print(f"Bỏ giá trị bất thường từ feed '{feed}': {data.get('value')} {verdict.flags}")
+    return verdict.value
+
+def get_sensor_status():
+    """
+    Thống kê từng feed và các cảnh báo gần nhất.
+    """
+    return sensor_monitor.status()
+
 def is_connected():
     """
     Kiểm tra client MQTT đã kết nối chưa.
@@ -78,40 +179,40 @@ def is_connected():
     return client.is_connected()
 
 def get_temperature():
-    return get_latest_from_feed("temperature")
+    return get_checked_from_feed("temperature")
 
 def get_energy_consumption():
-    return get_latest_from_feed("energy")
+    return get_checked_from_feed("energy")
 
 def get_humidity():
-    return get_latest_from_feed("humidity")
+    return get_checked_from_feed("humidity")
 
 def get_brightness():
-    return get_latest_from_feed("brightness")
+    return get_checked_from_feed("brightness")
 
-def turn_on_fan():
+def turn_on_fan(qos: int = 0):
     """
     Bật quạt (gửi '1' tới feed Fan)
     """
-    publish_to_feed('Fan', 'ON')
+    return publish_to_feed('Fan', 'ON', qos=qos)
 
-def turn_off_fan():
+def turn_off_fan(qos: int = 0):
     """
     Tắt quạt (gửi '0' tới feed Fan)
     """
-    publish_to_feed('Fan', 'OFF')
+    return publish_to_feed('Fan', 'OFF', qos=qos)
 
-def turn_on_light():
+def turn_on_light(qos: int = 0):
     """
     Bật đèn (gửi '1' tới feed Light)
     """
-    publish_to_feed('Light', 'ON')
+    return publish_to_feed('Light', 'ON', qos=qos)
 
-def turn_off_light():
+def turn_off_light(qos: int = 0):
     """
     Tắt đèn (gửi '0' tới feed Light)
     """
-    publish_to_feed('Light', 'OFF')
+    return publish_to_feed('Light', 'OFF', qos=qos)
 
 def loop_stop():
     """
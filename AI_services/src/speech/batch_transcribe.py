@@ -0,0 +1,200 @@
+# File: src/speech/batch_transcribe.py
+#
+# Chạy nhận dạng + phân loại intent hàng loạt trên một thư mục audio đã ghi âm,
+# để đánh giá thay đổi recognizer / matcher trước khi đưa xuống thiết bị.
+#
+# Cấu trúc thư mục mặc định (nhãn lấy từ đường dẫn):
+#   <audio-dir>/<language-code>/<INTENT>/<file>.wav   ví dụ  corpus/vi-VN/TURN_ON_LIGHT/001.wav
+# Intent "NONE" nghĩa là câu không nên khớp intent nào.
+# Hoặc dùng --labels labels.csv với các cột: file,language,intent
+#
+# Usage (run from AI_services/):
+#   python src/speech/batch_transcribe.py --audio-dir corpus --backend whisper --workers 8
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import speech_recognition as sr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from speech_pipeline import BACKENDS, WavFileSource, get_backend
+from speech_to_text import Language, SpeechToText, intent_config
+from tracing import percentile
+
+NO_INTENT = "NONE"
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../logs')
+
+# Mỗi process con giữ recognizer + backend riêng, tạo một lần
+_worker = {}
+
+
+def _init_worker(backend_name):
+    _worker["recognizer"] = sr.Recognizer()
+    _worker["backend"] = get_backend(backend_name)
+
+
+def transcribe_file(job):
+    path, language_code, expected, fuzzy = job
+    language = Language(language_code)
+    recognizer, backend = _worker["recognizer"], _worker["backend"]
+
+    error = None
+    text = None
+    start = time.perf_counter()
+    loaded = start
+    try:
+        audio, _ = WavFileSource(path).read(recognizer)
+        loaded = time.perf_counter()
+        text = backend.recognize(recognizer, audio, language)
+    except sr.UnknownValueError:
+        pass
+    except Exception as e:
+        error = str(e)
+    recognized = time.perf_counter()
+    if loaded == start:
+        # Đọc file lỗi: tính toàn bộ thời gian vào load
+        loaded = recognized
+    load_ms = (loaded - start) * 1000
+    recognize_ms = (recognized - loaded) * 1000
+
+    match_start = time.perf_counter()
+    score = None
+    if not text:
+        predicted = None
+    elif fuzzy:
+        match = SpeechToText.classify_fuzzy(text, intent_config)
+        predicted, score = (match.intent, match.score) if match else (None, None)
+    else:
+        predicted = SpeechToText.classify_by_template(text, intent_config)
+    match_ms = (time.perf_counter() - match_start) * 1000
+
+    return {
+        "file": path,
+        "language": language_code,
+        "expected": expected,
+        "transcript": text,
+        "predicted": predicted or NO_INTENT,
+        "score": score,
+        "correct": expected is not None and (predicted or NO_INTENT) == expected,
+        "load_ms": round(load_ms, 2),
+        "recognize_ms": round(recognize_ms, 2),
+        "match_ms": round(match_ms, 3),
+        "total_ms": round(load_ms + recognize_ms + match_ms, 2),
+        "error": error,
+    }
+
+
+def discover_jobs(audio_dir, default_language):
+    """
+    Tìm file audio theo cấu trúc <language>/<INTENT>/<file>. Thư mục không
+    phải mã Language thì dùng default_language; không có thư mục intent thì
+    không có nhãn.
+    """
+    codes = {l.value for l in Language}
+    jobs = []
+    for root, _, files in os.walk(audio_dir):
+        parts = os.path.relpath(root, audio_dir).split(os.sep)
+        parts = [] if parts == ['.'] else parts
+        language = parts[0] if parts and parts[0] in codes else default_language.value
+        rest = parts[1:] if parts and parts[0] in codes else parts
+        expected = rest[0] if rest else None
+        for f in sorted(files):
+            if f.lower().endswith(WavFileSource.EXTENSIONS):
+                jobs.append((os.path.join(root, f), language, expected))
+    return jobs
+
+
+def load_label_jobs(labels_path, audio_dir, default_language):
+    """
+    Đọc file nhãn; dòng có mã ngôn ngữ không thuộc Language được báo ngay và
+    bỏ qua, không để lỗi trong worker làm hỏng cả batch.
+    """
+    codes = {l.value for l in Language}
+    jobs = []
+    invalid = []
+    with open(labels_path, newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            language = row.get("language") or default_language.value
+            if language not in codes:
+                invalid.append((line, row.get("file"), language))
+                continue
+            jobs.append((
+                os.path.join(audio_dir, row["file"]),
+                language,
+                row.get("intent") or None,
+            ))
+    if invalid:
+        print(f"Skipping {len(invalid)} row(s) with unknown language (expected one of {sorted(codes)}):")
+        for line, path, language in invalid:
+            print(f"  {labels_path}:{line} {path} language='{language}'")
+    return jobs
+
+
+def print_report(results, wall_seconds):
+    totals = [r["total_ms"] for r in results]
+    print(f"\nFiles: {len(results)}  wall: {wall_seconds:.1f}s  "
+          f"throughput: {len(results) / wall_seconds:.2f} files/s")
+    print(f"Per-file latency ms: p50={percentile(totals, 50):.0f} p90={percentile(totals, 90):.0f} "
+          f"p99={percentile(totals, 99):.0f} max={max(totals, default=0):.0f}")
+    print(f"Recognize ms p50={percentile([r['recognize_ms'] for r in results], 50):.0f}  "
+          f"match ms p50={percentile([r['match_ms'] for r in results], 50):.3f}")
+
+    by_language = defaultdict(list)
+    for r in results:
+        by_language[r["language"]].append(r)
+
+    print(f"\n{'language':<10} {'files':>6} {'labeled':>8} {'accuracy':>9} {'no text':>8} {'errors':>7}")
+    for code, rows in sorted(by_language.items()):
+        labeled = [r for r in rows if r["expected"] is not None]
+        accuracy = sum(r["correct"] for r in labeled) / len(labeled) if labeled else float('nan')
+        no_text = sum(r["transcript"] is None for r in rows)
+        errors = sum(r["error"] is not None for r in rows)
+        print(f"{Language(code).name:<10} {len(rows):>6} {len(labeled):>8} {accuracy:>9.1%} {no_text:>8} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch transcription + intent evaluation")
+    parser.add_argument("--audio-dir", required=True)
+    parser.add_argument("--labels", default=None, help="CSV file,language,intent (paths relative to --audio-dir)")
+    parser.add_argument("--language", choices=[l.name for l in Language], default="ENGLISH",
+                        help="Language for files without a language directory / column")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="google")
+    parser.add_argument("--workers", type=int, default=None, help="Default: all CPU cores")
+    parser.add_argument("--fuzzy", action="store_true", help="Use fuzzy intent matching")
+    parser.add_argument("--output", default=os.path.join(LOG_DIR, "batch_transcribe.csv"))
+    args = parser.parse_args()
+
+    default_language = Language[args.language]
+    if args.labels:
+        jobs = load_label_jobs(args.labels, args.audio_dir, default_language)
+    else:
+        jobs = discover_jobs(args.audio_dir, default_language)
+    if not jobs:
+        print(f"No audio files found in {args.audio_dir}")
+        return
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Transcribing {len(jobs)} file(s) with '{args.backend}' on {workers} processes...")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(args.backend,)) as executor:
+        results = list(executor.map(transcribe_file, [job + (args.fuzzy,) for job in jobs], chunksize=4))
+    wall_seconds = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+    print_report(results, wall_seconds)
+    print(f"\nPer-file results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# File: src/speech/benchmark_intent_matcher.py
+#
+# So sánh nested-loop substring search cũ với automaton IntentMatcher trên các
+# bộ template đa ngôn ngữ lớn dần.
+#
+# Usage (run from AI_services/):
+#   python src/speech/benchmark_intent_matcher.py
+#   python src/speech/benchmark_intent_matcher.py --sizes 100 1000 10000 --transcripts 500
+import argparse
+import json
+import os
+import random
+import time
+
+from intent_matcher import FuzzyIntentMatcher, IntentMatcher, char_ngrams
+
+# Bảng chữ mẫu cho từng mã ngôn ngữ trong Language
+ALPHABETS = {
+    'en-US': 'abcdefghijklmnopqrstuvwxyz',
+    'es-ES': 'abcdefghijklmnñopqrstuvwxyzáéíóú',
+    'fr-FR': 'abcdefghijklmnopqrstuvwxyzàâçéèêëîïôûù',
+    'de-DE': 'abcdefghijklmnopqrstuvwxyzäöüß',
+    'it-IT': 'abcdefghijklmnopqrstuvwxyzàèéìòù',
+    'pt-PT': 'abcdefghijklmnopqrstuvwxyzãõáéíóúç',
+    'ja-JP': 'あいうえおかきくけこさしすせそたちつてとなにぬねのライトファン',
+    'zh-CN': '打开关闭灯风扇停止请把客厅卧室空调',
+    'ko-KR': '불을켜끄선풍기정지거실방에어컨',
+    'ru-RU': 'абвгдежзийклмнопрстуфхцчшщыэюя',
+    'vi-VN': 'abcdeghiklmnopqrstuvxyăâđêôơưàáảãạằắẳẵặèéẻẽẹ',
+}
+
+
+def random_word(rng, alphabet):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 7)))
+
+
+def make_config(n_templates, rng, per_intent=20):
+    """
+    Sinh intents.json giả: mỗi intent có `per_intent` template, ngôn ngữ xoay vòng.
+    """
+    languages = list(ALPHABETS)
+    config = {}
+    for i in range(0, n_templates, per_intent):
+        language = languages[(i // per_intent) % len(languages)]
+        alphabet = ALPHABETS[language]
+        sep = '' if language in ('ja-JP', 'zh-CN') else ' '
+        config[f'INTENT_{i // per_intent}_{language}'] = {
+            'templates': [
+                sep.join(random_word(rng, alphabet) for _ in range(rng.randint(2, 4)))
+                for _ in range(min(per_intent, n_templates - i))
+            ]
+        }
+    return config
+
+
+def make_transcripts(config, n, rng, hit_ratio=0.5):
+    templates = [t for c in config.values() for t in c['templates']]
+    alphabet = ''.join(ALPHABETS.values())
+    transcripts = []
+    for _ in range(n):
+        words = [random_word(rng, alphabet) for _ in range(rng.randint(3, 10))]
+        if rng.random() < hit_ratio:
+            words.insert(rng.randint(0, len(words)), rng.choice(templates))
+        transcripts.append(' '.join(words))
+    return transcripts
+
+
+def classify_nested_loop(transcript, intent_config):
+    # Cách cũ của SpeechToText.classify_by_template, giữ lại làm baseline
+    transcript = transcript.lower()
+    for action, config in intent_config.items():
+        for template in config["templates"]:
+            if template.lower() in transcript:
+                return action
+    return None
+
+
+def add_noise(transcript, rng, rate=0.08):
+    # Mô phỏng lỗi nhận dạng: xóa ký tự hoặc lặp lại ký tự trước
+    chars = list(transcript)
+    for i in range(len(chars)):
+        if chars[i] != ' ' and rng.random() < rate:
+            chars[i] = '' if rng.random() < 0.5 else (chars[i - 1] or ' ')
+    return ''.join(chars)
+
+
+def classify_fuzzy_brute_force(transcript, intent_config, min_score=0.6):
+    # Baseline: chấm điểm n-gram với MỌI template, không dùng index
+    grams = char_ngrams(transcript)
+    best = None
+    for action, config in intent_config.items():
+        for template in config["templates"]:
+            t_grams = char_ngrams(template)
+            score = len(grams & t_grams) / len(t_grams)
+            if score >= min_score and (best is None or score > best[0]):
+                best = (score, action)
+    return best[1] if best else None
+
+
+def time_per_call_us(fn, transcripts):
+    start = time.perf_counter()
+    for t in transcripts:
+        fn(t)
+    return (time.perf_counter() - start) * 1e6 / len(transcripts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Intent matcher benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000, 20000])
+    parser.add_argument('--transcripts', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    # Bộ intents.json thật để làm mốc
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json'), encoding='utf-8') as f:
+        real_config = json.load(f)
+    cases = [('intents.json', real_config)] + [(str(n), make_config(n, rng)) for n in args.sizes]
+
+    print(f"{'templates':>12} {'build ms':>10} {'nested us':>12} {'automaton us':>14} {'speedup':>9}"
+          f" {'fuzzy brute us':>15} {'fuzzy index us':>15} {'fuzzy p99 ms':>13}")
+    for label, config in cases:
+        transcripts = make_transcripts(config, args.transcripts, rng)
+
+        start = time.perf_counter()
+        matcher = IntentMatcher(config)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # Hai cách phải cho cùng kết quả
+        for t in transcripts:
+            assert matcher.classify(t) == classify_nested_loop(t, config), t
+
+        nested = time_per_call_us(lambda t: classify_nested_loop(t, config), transcripts)
+        automaton = time_per_call_us(matcher.classify, transcripts)
+
+        noisy = [add_noise(t, rng) for t in transcripts]
+        fuzzy_matcher = FuzzyIntentMatcher(config)
+        fuzzy_brute = time_per_call_us(lambda t: classify_fuzzy_brute_force(t, config), noisy)
+        fuzzy_index = time_per_call_us(fuzzy_matcher.match, noisy)
+        timings = []
+        for t in noisy:
+            start = time.perf_counter()
+            fuzzy_matcher.match(t)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p99 = timings[int(0.99 * (len(timings) - 1))]
+
+        count = sum(len(c['templates']) for c in config.values())
+        print(f"{count:>12} {build_ms:>10.1f} {nested:>12.1f} {automaton:>14.1f} {nested / automaton:>8.1f}x"
+              f" {fuzzy_brute:>15.1f} {fuzzy_index:>15.1f} {p99:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
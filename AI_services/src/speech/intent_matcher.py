@@ -0,0 +1,200 @@
+# File: src/speech/intent_matcher.py
+import re
+import time
+from collections import deque, namedtuple
+
+
+class IntentMatcher:
+    """
+    Aho-Corasick automaton over all templates of an intents.json config,
+    built once at load time.
+
+    Priority rules (deterministic, same result as the old nested loop):
+      1. the intent declared first in intents.json wins,
+      2. then the longest matching template,
+      3. then the template declared first.
+    The best match reachable from every automaton state is precomputed, so
+    classifying a transcript is one pass over its characters no matter how
+    many templates or intents there are.
+    """
+
+    def __init__(self, intent_config: dict):
+        self.intents = list(intent_config.keys())
+        self.templates = []
+        # State 0 is the root
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+        self._top_rank = None
+
+        for intent_index, (action, config) in enumerate(intent_config.items()):
+            for template in config["templates"]:
+                template = template.lower()
+                if not template:
+                    continue
+                rank = (intent_index, -len(template), len(self.templates))
+                self.templates.append((action, template))
+                self._add(template, rank)
+                if self._top_rank is None or rank < self._top_rank:
+                    self._top_rank = rank
+
+        self._build_links()
+
+    def _add(self, template, rank):
+        state = 0
+        for ch in template:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            state = nxt
+        if self._best[state] is None or rank < self._best[state]:
+            self._best[state] = rank
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state:
+                    fail = self._fail[state]
+                    while fail and ch not in self._goto[fail]:
+                        fail = self._fail[fail]
+                    self._fail[nxt] = self._goto[fail].get(ch, 0)
+                # Merge the best output of the suffix state (BFS order: already final)
+                inherited = self._best[self._fail[nxt]]
+                if inherited is not None and (self._best[nxt] is None or inherited < self._best[nxt]):
+                    self._best[nxt] = inherited
+
+    def match(self, transcript: str):
+        """
+        Trả về (action, template) khớp tốt nhất, hoặc None.
+        """
+        if not transcript:
+            return None
+        goto, fail, best_at = self._goto, self._fail, self._best
+        state = 0
+        best = None
+        for ch in transcript.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            rank = best_at[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == self._top_rank:
+                    break
+        if best is None:
+            return None
+        return self.templates[best[2]]
+
+    def classify(self, transcript: str):
+        matched = self.match(transcript)
+        return matched[0] if matched else None
+
+
+FuzzyMatch = namedtuple("FuzzyMatch", ["intent", "template", "score", "elapsed_ms", "truncated"])
+
+
+def char_ngrams(text: str, n: int = 3):
+    text = " " + re.sub(r"\s+", " ", text.lower().strip()) + " "
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class FuzzyIntentMatcher:
+    """
+    Fuzzy intent matching for noisy transcripts ("turn of the light", "fan of").
+
+    All templates are indexed once in a character n-gram inverted index. A
+    query only touches the postings of its own n-grams, so there is no edit
+    distance against every template. A template scores the fraction of its
+    n-grams found in the transcript (1.0 = contained exactly); ties go to the
+    closer overall size (Dice), then to the IntentMatcher priority rules.
+    """
+
+    def __init__(self, intent_config: dict, n: int = 3):
+        self.n = n
+        self.exact = IntentMatcher(intent_config)
+        self.templates = self.exact.templates
+        self._sizes = []
+        self._index = {}
+        for template_id, (action, template) in enumerate(self.templates):
+            grams = char_ngrams(template, n)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._index.setdefault(gram, []).append(template_id)
+        # Intent order for tie-breaking
+        self._priority = {action: i for i, action in enumerate(self.exact.intents)}
+
+    def match(self, transcript: str, min_score: float = 0.6, time_budget_ms: float = 5.0):
+        """
+        Trả về FuzzyMatch tốt nhất (score >= min_score) hoặc None.
+        Nếu vượt time_budget_ms, dừng đếm và trả kết quả tốt nhất hiện có
+        (truncated=True).
+        """
+        start = time.perf_counter()
+        if not transcript:
+            return None
+
+        exact = self.exact.match(transcript)
+        if exact:
+            return FuzzyMatch(exact[0], exact[1], 1.0, (time.perf_counter() - start) * 1000, False)
+
+        grams = char_ngrams(transcript, self.n)
+        deadline = start + time_budget_ms / 1000
+        truncated = False
+        shared = {}
+        for gram in grams:
+            for template_id in self._index.get(gram, ()):
+                shared[template_id] = shared.get(template_id, 0) + 1
+            if time.perf_counter() > deadline:
+                truncated = True
+                break
+
+        best_key, best_id = None, None
+        for template_id, count in shared.items():
+            size = self._sizes[template_id]
+            score = count / size
+            if score < min_score:
+                continue
+            dice = 2 * count / (size + len(grams))
+            action = self.templates[template_id][0]
+            key = (-score, -dice, self._priority[action], template_id)
+            if best_key is None or key < best_key:
+                best_key, best_id = key, template_id
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if best_id is None:
+            return None
+        action, template = self.templates[best_id]
+        return FuzzyMatch(action, template, round(-best_key[0], 3), elapsed_ms, truncated)
+
+
+_compiled = {}
+
+
+def _get_compiled(kind, intent_config: dict):
+    """
+    Matcher đã biên dịch cho một config, chỉ build lần đầu.
+    Giữ tham chiếu tới config để id() không bị dùng lại.
+    """
+    key = (kind.__name__, id(intent_config))
+    cached = _compiled.get(key)
+    if cached is None or cached[0] is not intent_config:
+        cached = (intent_config, kind(intent_config))
+        _compiled[key] = cached
+    return cached[1]
+
+
+def get_matcher(intent_config: dict) -> IntentMatcher:
+    return _get_compiled(IntentMatcher, intent_config)
+
+
+def get_fuzzy_matcher(intent_config: dict) -> FuzzyIntentMatcher:
+    return _get_compiled(FuzzyIntentMatcher, intent_config)
@@ -0,0 +1,326 @@
+# File: src/speech/speech_pipeline.py
+#
+# Pipeline nhận dạng giọng nói chạy lâu dài: một thread thu âm liên tục vào
+# queue, một thread nhận dạng lấy audio ra xử lý, nên thu âm câu tiếp theo
+# chồng lên thời gian nhận dạng câu trước. Recognizer, micro và ngưỡng nhiễu
+# nền chỉ khởi tạo / hiệu chỉnh một lần.
+#
+# Usage (run from AI_services/):
+#   python src/speech/speech_pipeline.py --device-index 1
+#   python src/speech/speech_pipeline.py --wav recordings/ --backend sphinx
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import speech_recognition as sr
+
+from speech_to_text import Language, SpeechToText, intent_config
+
+Transcript = namedtuple(
+    "Transcript", ["text", "language", "source", "captured_at", "capture_ms", "recognized_at", "recognize_ms"]
+)
+
+# Audio đã thu, chờ nhận dạng
+Utterance = namedtuple("Utterance", ["audio", "source", "captured_at", "capture_ms"])
+
+
+# === Recognizer backends ===
+class RecognizerBackend(ABC):
+    name = "base"
+    offline = False
+
+    @abstractmethod
+    def recognize(self, recognizer: sr.Recognizer, audio: sr.AudioData, language: Language):
+        """
+        Trả về text; ném sr.UnknownValueError nếu không nghe ra được gì.
+        """
+
+
+class GoogleBackend(RecognizerBackend):
+    """
+    Google Web Speech API (cần mạng).
+    """
+    name = "google"
+
+    def recognize(self, recognizer, audio, language):
+        return recognizer.recognize_google(audio, language=language.value)
+
+
+class SphinxBackend(RecognizerBackend):
+    """
+    CMU Sphinx chạy local (cần pocketsphinx, mặc định chỉ có model en-US).
+    """
+    name = "sphinx"
+    offline = True
+
+    def recognize(self, recognizer, audio, language):
+        return recognizer.recognize_sphinx(audio, language=language.value)
+
+
+class WhisperBackend(RecognizerBackend):
+    """
+    OpenAI Whisper chạy local (cần openai-whisper). Model được load một lần
+    ở lần gọi đầu và SpeechRecognition giữ lại cho các lần sau.
+    """
+    name = "whisper"
+    offline = True
+
+    def __init__(self, model: str = "base"):
+        self.model = model
+
+    def recognize(self, recognizer, audio, language):
+        # Whisper dùng mã ngôn ngữ 2 ký tự: 'en-US' -> 'en'
+        return recognizer.recognize_whisper(audio, model=self.model, language=language.value.split('-')[0])
+
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    SphinxBackend.name: SphinxBackend,
+    WhisperBackend.name: WhisperBackend,
+}
+
+
+def get_backend(name: str, **kwargs) -> RecognizerBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown recognizer backend '{name}', choose from {list(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+# === Audio sources ===
+class MicrophoneSource:
+    """
+    Micro mở một lần cho cả pipeline, hiệu chỉnh nhiễu nền một lần khi mở.
+    """
+    name = "microphone"
+    live = True
+
+    def __init__(self, device_index=None, calibration_seconds: float = 1.0,
+                 listen_timeout: float = 1.0, phrase_time_limit=None):
+        self.device_index = device_index
+        self.calibration_seconds = calibration_seconds
+        self.listen_timeout = listen_timeout
+        self.phrase_time_limit = phrase_time_limit
+        self._mic = None
+        self._stream = None
+
+    def open(self, recognizer: sr.Recognizer):
+        self._mic = sr.Microphone(device_index=self.device_index)
+        self._stream = self._mic.__enter__()
+        if self.calibration_seconds:
+            recognizer.adjust_for_ambient_noise(self._stream, duration=self.calibration_seconds)
+            print(f"Calibrated energy threshold: {recognizer.energy_threshold:.1f}")
+
+    def read(self, recognizer: sr.Recognizer):
+        """
+        Trả về (audio, label). Hết timeout mà chưa có tiếng nói thì trả về
+        (None, None) để thread thu âm kiểm tra cờ dừng rồi nghe tiếp.
+        """
+        try:
+            audio = recognizer.listen(self._stream, timeout=self.listen_timeout,
+                                      phrase_time_limit=self.phrase_time_limit)
+        except sr.WaitTimeoutError:
+            return None, None
+        return audio, self.name
+
+    def exhausted(self):
+        return False
+
+    def close(self):
+        if self._mic:
+            self._mic.__exit__(None, None, None)
+            self._mic = self._stream = None
+
+
+class WavFileSource:
+    """
+    Đọc lần lượt các file WAV/AIFF/FLAC (một file hoặc cả thư mục) thay cho
+    micro, dùng để test pipeline không cần micro.
+    """
+    name = "wav"
+    live = False
+    EXTENSIONS = ('.wav', '.aiff', '.aif', '.flac')
+
+    def __init__(self, path: str):
+        if os.path.isdir(path):
+            self.files = sorted(
+                os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(self.EXTENSIONS)
+            )
+        else:
+            self.files = [path]
+        self._next = 0
+
+    def open(self, recognizer: sr.Recognizer):
+        self._next = 0
+
+    def read(self, recognizer: sr.Recognizer):
+        if self.exhausted():
+            return None, None
+        path = self.files[self._next]
+        self._next += 1
+        with sr.AudioFile(path) as source:
+            return recognizer.record(source), path
+
+    def exhausted(self):
+        return self._next >= len(self.files)
+
+    def close(self):
+        pass
+
+
+# === Pipeline ===
+_END = object()
+
+
+class SpeechPipeline:
+    """
+    source -> [capture thread] -> audio queue -> [recognize thread] -> transcripts
+
+    Audio queue có giới hạn. Với nguồn live (micro), nếu nhận dạng chậm hơn thu
+    âm thì câu cũ nhất bị bỏ để lệnh mới nhất không phải chờ; với nguồn file thì
+    thread thu âm chờ, không bỏ file nào.
+    """
+
+    def __init__(self, source, backend: RecognizerBackend = None, language: Language = Language.ENGLISH,
+                 queue_size: int = 8, on_transcript=None):
+        self.source = source
+        self.backend = backend or GoogleBackend()
+        self.language = language
+        self.on_transcript = on_transcript
+        self.recognizer = sr.Recognizer()
+        self.audio_queue = queue.Queue(maxsize=queue_size)
+        self.transcripts = queue.Queue()
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self.source.open(self.recognizer)
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="speech-capture", daemon=True),
+            threading.Thread(target=self._recognize_loop, name="speech-recognize", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=5)
+        self.source.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def get(self, timeout=None):
+        """
+        Transcript tiếp theo; None khi nguồn đã hết (ví dụ hết file WAV).
+        """
+        item = self.transcripts.get(timeout=timeout)
+        return None if item is _END else item
+
+    def __iter__(self):
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    def _enqueue(self, item):
+        while not self._stop.is_set():
+            try:
+                self.audio_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if item is _END or not self.source.live:
+                    continue
+                try:
+                    self.audio_queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _capture_loop(self):
+        while not self._stop.is_set() and not self.source.exhausted():
+            start = time.perf_counter()
+            try:
+                audio, label = self.source.read(self.recognizer)
+            except Exception as e:
+                print(f"Capture error: {e}")
+                if not self.source.live:
+                    break
+                # Micro lỗi tạm thời: chờ một chút rồi nghe tiếp, không dừng cả pipeline
+                self._stop.wait(0.5)
+                continue
+            if audio is None:
+                continue
+            self._enqueue(Utterance(audio, label, time.time(), (time.perf_counter() - start) * 1000))
+        self._enqueue(_END)
+
+    def _recognize_loop(self):
+        try:
+            while True:
+                try:
+                    utterance = self.audio_queue.get(timeout=0.5)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                if utterance is _END:
+                    break
+                self._recognize_one(utterance)
+        finally:
+            # Luôn báo hết để get() / __iter__ không chờ mãi
+            self.transcripts.put(_END)
+
+    def _recognize_one(self, utterance):
+        # Lỗi của một câu (backend thiếu thư viện, callback lỗi...) không làm chết thread
+        start = time.perf_counter()
+        try:
+            text = self.backend.recognize(self.recognizer, utterance.audio, self.language)
+        except sr.UnknownValueError:
+            text = None
+        except Exception as e:
+            print(f"Recognizer '{self.backend.name}' error: {e}")
+            text = None
+        result = Transcript(text, self.language, utterance.source, utterance.captured_at,
+                            utterance.capture_ms, time.time(), (time.perf_counter() - start) * 1000)
+
+        if self.on_transcript:
+            try:
+                self.on_transcript(result)
+            except Exception as e:
+                print(f"on_transcript callback error: {e}")
+        self.transcripts.put(result)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Streaming speech pipeline")
+    parser.add_argument("--device-index", type=int, default=None)
+    parser.add_argument("--wav", default=None, help="WAV file or directory instead of the microphone")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="google")
+    parser.add_argument("--language", choices=[l.name for l in Language], default="ENGLISH")
+    args = parser.parse_args()
+
+    source = WavFileSource(args.wav) if args.wav else MicrophoneSource(args.device_index)
+    pipeline = SpeechPipeline(source, get_backend(args.backend), Language[args.language])
+
+    print("Start speaking..." if not args.wav else f"Transcribing {len(source.files)} file(s)...")
+    try:
+        with pipeline:
+            for transcript in pipeline:
+                action = SpeechToText.classify_by_template(transcript.text, intent_config) if transcript.text else None
+                print(f"[{transcript.source}] '{transcript.text}' -> {action} "
+                      f"(capture {transcript.capture_ms:.0f}ms, recognize {transcript.recognize_ms:.0f}ms)")
+                if action == "STOP":
+                    break
+    except KeyboardInterrupt:
+        pass
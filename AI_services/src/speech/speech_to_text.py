@@ -3,8 +3,10 @@ from enum import Enum
 import json, re
 import os
 
-intent_path = os.path.join(os.path.abspath(__file__), '../../speech/intents.json')
-with open(intent_path, "r") as f:
+from intent_matcher import get_matcher, get_fuzzy_matcher
+
+intent_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json')
+with open(intent_path, "r", encoding="utf-8") as f:
     intent_config = json.load(f)
 
 class Language(Enum):
@@ -42,12 +44,13 @@ class SpeechToText:
     
     @staticmethod
     def classify_by_template(transcript: str, intent_config: dict):
-        transcript = transcript.lower()
-        for action, config in intent_config.items():
-            for template in config["templates"]:
-                if template.lower() in transcript:
-                    return action
-        return None
+        # Templates are compiled into one automaton the first time a config is seen
+        return get_matcher(intent_config).classify(transcript)
+
+    @staticmethod
+    def classify_fuzzy(transcript: str, intent_config: dict, min_score: float = 0.6, time_budget_ms: float = 5.0):
+        # FuzzyMatch(intent, template, score, elapsed_ms, truncated) or None
+        return get_fuzzy_matcher(intent_config).match(transcript, min_score, time_budget_ms)
 
 
 
@@ -0,0 +1,163 @@
+# File: src/tracing.py
+#
+# Tracing nhẹ cho luồng lệnh giọng nói -> thiết bị. Mỗi span được ghi thành một
+# dòng JSON với tên trường theo OpenTelemetry (traceId, spanId, parentSpanId,
+# startTimeUnixNano, endTimeUnixNano, attributes), nên có thể đẩy sang collector
+# OTLP sau này mà không đổi định dạng.
+#
+# Báo cáo percentile theo từng stage:
+#   python src/tracing.py --report logs/voice_traces.jsonl
+import json
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_span_id=None, start_ns=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, message):
+        self.status = "ERROR"
+        self.attributes["error.message"] = str(message)
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None
+
+    def to_dict(self, service_name):
+        return {
+            "resource": {"service.name": service_name},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class JsonlExporter:
+    """
+    Ghi span vào file JSON Lines (append, an toàn giữa các thread).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    def __init__(self, service_name, exporter=None):
+        self.service_name = service_name
+        self.exporter = exporter
+
+    @staticmethod
+    def new_trace_id():
+        return secrets.token_hex(16)
+
+    def start_span(self, name, trace_id, parent=None, start_ns=None, **attributes):
+        """
+        Mở span thủ công, kết thúc bằng end_span(). Dùng cho span cha có
+        span con được ghi trước khi nó kết thúc.
+        """
+        return Span(name, trace_id, parent.span_id if parent else None, start_ns=start_ns, attributes=attributes)
+
+    def end_span(self, span, end_ns=None):
+        span.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if self.exporter:
+            self.exporter.export(span.to_dict(self.service_name))
+        return span
+
+    @contextmanager
+    def span(self, name, trace_id, parent=None, **attributes):
+        """
+        Đo một đoạn code: with tracer.span("intent_match", trace_id, parent=root): ...
+        """
+        span = self.start_span(name, trace_id, parent, **attributes)
+        try:
+            yield span
+        except Exception as e:
+            span.set_error(e)
+            raise
+        finally:
+            self.end_span(span)
+
+    def record(self, name, trace_id, start_ns, end_ns, parent=None, **attributes):
+        """
+        Ghi một span đã đo ở nơi khác (ví dụ trong thread thu âm của pipeline).
+        """
+        return self.end_span(self.start_span(name, trace_id, parent, start_ns, **attributes), end_ns)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summarize(path):
+    """
+    Đọc file span và trả về thống kê latency (ms) theo tên stage.
+    """
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("durationMs") is not None:
+                durations[record["name"]].append(record["durationMs"])
+            if record.get("status") == "ERROR":
+                errors[record["name"]] += 1
+
+    return {
+        name: {
+            "count": len(values),
+            "errors": errors[name],
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values),
+        }
+        for name, values in durations.items()
+    }
+
+
+def print_summary(summary):
+    print(f"{'stage':<16} {'count':>6} {'errors':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]["p50"]):
+        print(f"{name:<16} {s['count']:>6} {s['errors']:>7} {s['p50']:>9.1f} {s['p90']:>9.1f} {s['p99']:>9.1f} {s['max']:>9.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-stage latency report from a span file")
+    parser.add_argument("--report", default=os.path.join(os.path.dirname(__file__), "../logs/voice_traces.jsonl"))
+    args = parser.parse_args()
+    print_summary(summarize(args.report))
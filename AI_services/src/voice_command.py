@@ -0,0 +1,117 @@
+# File: src/voice_command.py
+#
+# Điều khiển thiết bị bằng giọng nói, có tracing từng stage:
+#   capture -> recognition -> intent_match -> publish -> broker_ack
+# Mỗi lệnh là một trace, ghi vào logs/voice_traces.jsonl.
+#
+# Usage (run from AI_services/):
+#   python src/voice_command.py --device-index 1
+#   python src/voice_command.py --wav recordings/ --backend sphinx
+#   python src/tracing.py --report logs/voice_traces.jsonl
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'speech'))
+
+import mqttservice
+from speech_pipeline import BACKENDS, MicrophoneSource, SpeechPipeline, WavFileSource, get_backend
+from speech_to_text import Language, SpeechToText, intent_config
+from tracing import JsonlExporter, Tracer, print_summary, summarize
+
+TRACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../logs/voice_traces.jsonl')
+
+ACTIONS = {
+    "TURN_ON_LIGHT": mqttservice.turn_on_light,
+    "TURN_OFF_LIGHT": mqttservice.turn_off_light,
+    "TURN_ON_FAN": mqttservice.turn_on_fan,
+    "TURN_OFF_FAN": mqttservice.turn_off_fan,
+}
+
+
+def _ns(seconds):
+    return int(seconds * 1e9)
+
+
+def handle_transcript(transcript, tracer, qos=1, ack_timeout=5.0, fuzzy=False):
+    """
+    Phân loại transcript, gửi lệnh MQTT và ghi span cho từng stage.
+    Trả về intent đã thực hiện (hoặc None).
+    """
+    trace_id = tracer.new_trace_id()
+    capture_start = transcript.captured_at - transcript.capture_ms / 1000
+    root = tracer.start_span("voice_command", trace_id, start_ns=_ns(capture_start))
+
+    # Capture và recognition đã chạy trong thread của pipeline: ghi lại từ mốc thời gian
+    tracer.record("capture", trace_id, _ns(capture_start), _ns(transcript.captured_at), parent=root,
+                  source=str(transcript.source))
+    recognize_start = transcript.recognized_at - transcript.recognize_ms / 1000
+    tracer.record("recognition", trace_id, _ns(recognize_start), _ns(transcript.recognized_at), parent=root,
+                  language=transcript.language.value, transcript=transcript.text or "",
+                  queue_wait_ms=round((recognize_start - transcript.captured_at) * 1000, 2))
+
+    action = None
+    acked = None
+    try:
+        with tracer.span("intent_match", trace_id, parent=root, fuzzy=fuzzy) as span:
+            if transcript.text:
+                if fuzzy:
+                    match = SpeechToText.classify_fuzzy(transcript.text, intent_config)
+                    action = match.intent if match else None
+                    span.set_attribute("score", match.score if match else None)
+                else:
+                    action = SpeechToText.classify_by_template(transcript.text, intent_config)
+            span.set_attribute("intent", action)
+
+        if action in ACTIONS:
+            with tracer.span("publish", trace_id, parent=root, intent=action, qos=qos) as span:
+                result = ACTIONS[action](qos=qos)
+                span.set_attribute("mid", getattr(result, "mid", None))
+            with tracer.span("broker_ack", trace_id, parent=root, qos=qos) as span:
+                acked = mqttservice.wait_for_ack(result, ack_timeout)
+                span.set_attribute("acked", acked)
+                if not acked:
+                    span.set_error("no broker acknowledgement")
+    finally:
+        root.set_attribute("intent", action)
+        root.set_attribute("acked", acked)
+        tracer.end_span(root)
+    return action
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice -> device commands with stage tracing")
+    parser.add_argument("--device-index", type=int, default=None)
+    parser.add_argument("--wav", default=None, help="WAV file or directory instead of the microphone")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="google")
+    parser.add_argument("--language", choices=[l.name for l in Language], default="ENGLISH")
+    parser.add_argument("--qos", type=int, choices=[0, 1], default=1, help="1 waits for the broker PUBACK")
+    parser.add_argument("--fuzzy", action="store_true")
+    parser.add_argument("--trace-file", default=TRACE_PATH)
+    args = parser.parse_args()
+
+    tracer = Tracer("voice-command", JsonlExporter(args.trace_file))
+    source = WavFileSource(args.wav) if args.wav else MicrophoneSource(args.device_index)
+    pipeline = SpeechPipeline(source, get_backend(args.backend), Language[args.language])
+
+    print("Start speaking..." if not args.wav else f"Processing {len(source.files)} file(s)...")
+    try:
+        with pipeline:
+            for transcript in pipeline:
+                action = handle_transcript(transcript, tracer, qos=args.qos, fuzzy=args.fuzzy)
+                print(f"'{transcript.text}' -> {action}")
+                if action == "STOP":
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mqttservice.loop_stop()
+        mqttservice.disconnect()
+
+    if os.path.exists(args.trace_file):
+        print()
+        print_summary(summarize(args.trace_file))
+
+
+if __name__ == "__main__":
+    main()
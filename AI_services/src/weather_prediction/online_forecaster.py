@@ -0,0 +1,245 @@
+# File: src/weather_prediction/online_forecaster.py
+#
+# Forecaster ngắn hạn cập nhật online, O(1) cho mỗi quan sát mới, không cần
+# train lại từ đầu.
+#
+# Mỗi biến (temperature, humidity, pressure, windSpeed) có:
+#   - trung bình chạy của ngày hiện tại (cập nhật O(1) mỗi mẫu),
+#   - Holt exponential smoothing với damped trend trên chuỗi trung bình ngày:
+#     khi sang ngày mới, trung bình của ngày vừa xong được đưa vào Holt.
+# Dự báo ngày thứ h = level + trend * (phi + phi^2 + ... + phi^h), trend bị
+# damp nên dự báo 14 ngày không trôi vô hạn.
+#
+# Khởi động từ lịch sử logs/prediction.csv, lưu state ra JSON để restart không
+# phải đọc lại lịch sử:
+#   python src/weather_prediction/online_forecaster.py --bootstrap logs/prediction.csv
+import json
+import math
+import os
+from datetime import date, datetime, timedelta
+
+VARIABLES = ["temperature", "humidity", "pressure", "windSpeed"]
+
+# Chỉ dùng thay cho forecast mặc định khi đã có ít nhất MIN_DAYS ngày trọn vẹn
+# (đủ để có trend) và dữ liệu mới nhất không cũ hơn MAX_AGE_DAYS
+MIN_DAYS = 2
+MAX_AGE_DAYS = 3
+
+# Cột trong logs/prediction.csv -> tên biến
+CSV_COLUMNS = {
+    "predicted_temp": "temperature",
+    "humidity": "humidity",
+    "pressure": "pressure",
+    "wind_speed": "windSpeed",
+}
+
+
+class DampedHolt:
+    """
+    Holt linear smoothing với damped trend, cập nhật O(1).
+    """
+
+    def __init__(self, alpha=0.5, beta=0.2, phi=0.8):
+        self.alpha = alpha
+        self.beta = beta
+        self.phi = phi
+        self.level = None
+        self.trend = 0.0
+        self.n = 0
+
+    def update(self, value):
+        if self.level is None:
+            self.level = value
+        else:
+            previous = self.level
+            self.level = self.alpha * value + (1 - self.alpha) * (previous + self.phi * self.trend)
+            self.trend = self.beta * (self.level - previous) + (1 - self.beta) * self.phi * self.trend
+        self.n += 1
+
+    def forecast(self, steps):
+        if self.level is None:
+            return None
+        if self.phi == 1:
+            return self.level + steps * self.trend
+        damped = self.phi * (1 - self.phi ** steps) / (1 - self.phi)
+        return self.level + damped * self.trend
+
+    def to_dict(self):
+        return {"level": self.level, "trend": self.trend, "n": self.n}
+
+    def load(self, state):
+        self.level, self.trend, self.n = state["level"], state["trend"], state["n"]
+
+
+class VariableForecaster:
+    def __init__(self, **holt_params):
+        self.holt = DampedHolt(**holt_params)
+        self.day = None
+        self.day_sum = 0.0
+        self.day_count = 0
+
+    def update(self, value, day):
+        """
+        Trả về False (bỏ mẫu) nếu mẫu thuộc ngày đã đưa vào Holt: cộng nó vào
+        trung bình của ngày hiện tại sẽ làm sai ngày đó.
+        """
+        if self.day is not None and day < self.day:
+            return False
+        if self.day is not None and day > self.day and self.day_count:
+            # Ngày cũ đã xong: đưa trung bình ngày vào Holt
+            self.holt.update(self.day_sum / self.day_count)
+            self.day_sum, self.day_count = 0.0, 0
+        self.day = day
+        self.day_sum += value
+        self.day_count += 1
+        return True
+
+    def current_level(self):
+        """
+        Mức hiện tại: kết hợp Holt (các ngày trước) với trung bình ngày đang chạy.
+        """
+        if self.day_count == 0:
+            return self.holt.level
+        today_mean = self.day_sum / self.day_count
+        if self.holt.level is None:
+            return today_mean
+        return self.holt.alpha * today_mean + (1 - self.holt.alpha) * (self.holt.level + self.holt.phi * self.holt.trend)
+
+    def forecast(self, steps):
+        """
+        steps = 0 là hôm nay, 1 là ngày mai, ...
+        """
+        level = self.current_level()
+        if level is None:
+            return None
+        if steps == 0 or self.holt.level is None:
+            return level
+        return level + (self.holt.forecast(steps) - self.holt.level)
+
+    def to_dict(self):
+        return {
+            "holt": self.holt.to_dict(),
+            "day": self.day.isoformat() if self.day else None,
+            "day_sum": self.day_sum,
+            "day_count": self.day_count,
+        }
+
+    def load(self, state):
+        self.holt.load(state["holt"])
+        self.day = date.fromisoformat(state["day"]) if state["day"] else None
+        self.day_sum, self.day_count = state["day_sum"], state["day_count"]
+
+
+class OnlineWeatherForecaster:
+    def __init__(self, alpha=0.5, beta=0.2, phi=0.8):
+        self.params = {"alpha": alpha, "beta": beta, "phi": phi}
+        self.series = {v: VariableForecaster(**self.params) for v in VARIABLES}
+        self.observations = 0
+        self.last_observed = None
+
+    @property
+    def ready(self):
+        if self.last_observed is None or self.series["temperature"].holt.n < MIN_DAYS:
+            return False
+        age = datetime.now(self.last_observed.tzinfo) - self.last_observed
+        return age <= timedelta(days=MAX_AGE_DAYS)
+
+    def update(self, observation, timestamp=None):
+        """
+        Thêm một quan sát {temperature, humidity, pressure, windSpeed}; thiếu
+        biến nào thì bỏ qua biến đó, mẫu đến trễ (ngày đã đóng) bị bỏ. O(1).
+        """
+        timestamp = timestamp or datetime.now()
+        day = timestamp.date()
+        updated = False
+        for variable in VARIABLES:
+            value = observation.get(variable)
+            if value is None:
+                continue
+            value = float(value)
+            if math.isfinite(value) and self.series[variable].update(value, day):
+                updated = True
+        if updated:
+            self.observations += 1
+            self.last_observed = timestamp
+
+    def forecast(self, days, start=None):
+        """
+        Danh sách dict {date, temperature, humidity, pressure, windSpeed} cho `days` ngày.
+        """
+        start = start or date.today()
+        # Nếu dữ liệu cuối cùng đã cũ, dự báo tính từ ngày cuối có dữ liệu
+        last_day = self.last_observed.date() if self.last_observed else start
+        offset = max(0, (start - last_day).days)
+        return [
+            {
+                "date": (start + timedelta(days=i)).strftime("%Y-%m-%d"),
+                **{v: self.series[v].forecast(i + offset) for v in VARIABLES},
+            }
+            for i in range(days)
+        ]
+
+    def bootstrap_from_csv(self, path):
+        """
+        Đọc lịch sử telemetry (logs/prediction.csv) theo dòng, không giữ cả file
+        trong bộ nhớ.
+        """
+        import csv
+
+        count = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    timestamp = datetime.fromisoformat(row["timestamp"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                observation = {}
+                for column, variable in CSV_COLUMNS.items():
+                    try:
+                        observation[variable] = float(row[column])
+                    except (KeyError, TypeError, ValueError):
+                        pass
+                self.update(observation, timestamp)
+                count += 1
+        return count
+
+    def save(self, path):
+        state = {
+            "params": self.params,
+            "observations": self.observations,
+            "last_observed": self.last_observed.isoformat() if self.last_observed else None,
+            "series": {v: s.to_dict() for v, s in self.series.items()},
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        forecaster = cls(**state["params"])
+        forecaster.observations = state["observations"]
+        forecaster.last_observed = datetime.fromisoformat(state["last_observed"]) if state["last_observed"] else None
+        for variable, series_state in state["series"].items():
+            forecaster.series[variable].load(series_state)
+        return forecaster
+
+
+if __name__ == "__main__":
+    import argparse
+
+    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..")
+    parser = argparse.ArgumentParser(description="Online weather forecaster")
+    parser.add_argument("--bootstrap", default=os.path.join(base, "logs/prediction.csv"))
+    parser.add_argument("--state", default=os.path.join(base, "model/online_forecaster.json"))
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    forecaster = OnlineWeatherForecaster()
+    rows = forecaster.bootstrap_from_csv(args.bootstrap)
+    forecaster.save(args.state)
+    print(f"Bootstrapped from {rows} rows, state saved to {args.state}")
+    for day in forecaster.forecast(args.days):
+        print(day)
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    def __init__(self, buffer_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.overflows = 0
+
+
+class Broadcaster:
+    """
+    One producer per worker, fanned out to every subscriber.
+
+    The producer polls `produce()` every `interval` seconds while at least one
+    client is subscribed, and publishes only when a value changed: a full
+    snapshot to new subscribers, then deltas with just the changed fields.
+    Each subscriber has a bounded buffer; a slow consumer that overflows it
+    has its backlog dropped and is resynced with a single snapshot, so it can
+    never hold up the producer or the other clients.
+    """
+
+    def __init__(self, produce: Callable[[], Awaitable[Dict[str, Any]]], interval: float = 5.0,
+                 buffer_size: int = 16):
+        self.produce = produce
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.subscribers: Set[Subscriber] = set()
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.buffer_size)
+        self.subscribers.add(subscriber)
+        if self.snapshot is not None:
+            subscriber.queue.put_nowait(self._snapshot_event())
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def _snapshot_event(self) -> Dict[str, Any]:
+        return {"type": "snapshot", "version": self.version, "data": self.snapshot}
+
+    def _deliver(self, subscriber: Subscriber, event: Dict[str, Any]) -> None:
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Deltas were lost: drop the backlog and resync from a snapshot
+            subscriber.overflows += 1
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(self._snapshot_event())
+
+    def publish(self, data: Dict[str, Any]) -> bool:
+        changes = {k: v for k, v in data.items() if self.snapshot is None or self.snapshot.get(k) != v}
+        if not changes:
+            return False
+
+        first = self.snapshot is None
+        self.snapshot = dict(data)
+        self.version += 1
+        event = self._snapshot_event() if first else {"type": "delta", "version": self.version, "changes": changes}
+        for subscriber in list(self.subscribers):
+            self._deliver(subscriber, event)
+        return True
+
+    async def _run(self) -> None:
+        logger.info("Stream producer started")
+        while self.subscribers:
+            try:
+                self.publish(await self.produce())
+            except Exception as e:
+                logger.error(f"Stream producer error: {e}")
+            await asyncio.sleep(self.interval)
+        logger.info("Stream producer stopped (no subscribers)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "version": self.version,
+            "overflows": sum(s.overflows for s in self.subscribers),
+        }
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['version']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"